@@ -45,12 +45,8 @@ def main():
     steps = [
         "scripts/analysis/analyze_data_quality.py",
         "scripts/analysis/clean_data.py",
-        "scripts/transform_csv_dataset/create_zip_code_reference.py",
-        "scripts/transform_csv_dataset/standardize_customers.py",
-        "scripts/transform_csv_dataset/enrich_customers_with_geolocation.py",
-        "scripts/transform_csv_dataset/detect_seller_anomalies.py",
-        "scripts/transform_csv_dataset/standardize_sellers.py",
-        "scripts/transform_csv_dataset/enrich_sellers_with_geolocation.py",
+        # Geo stage in a single process so the zip reference is decoded once
+        "scripts/transform_csv_dataset/run_geo_stage.py",
         "scripts/transform_csv_dataset/merge_product_translations.py",
         "scripts/transform_csv_dataset/advanced_financial_cleaning.py",
         "scripts/db/init_db.py",       
@@ -1,5 +1,6 @@
 import os
 import pandas as pd
+import numpy as np
 from datetime import datetime
 import yaml
 
@@ -20,15 +21,26 @@ print("Loading raw datasets...")
 df_reviews = pd.read_csv(os.path.join(RAW_DATA_PATH, 'olist_order_reviews_dataset.csv'))
 df_orders = pd.read_csv(os.path.join(RAW_DATA_PATH, 'olist_orders_dataset.csv'))
 df_products = pd.read_csv(os.path.join(RAW_DATA_PATH, 'olist_products_dataset.csv'))
-df_geolocation = pd.read_csv(os.path.join(RAW_DATA_PATH, 'olist_geolocation_dataset.csv'))
+# Geolocation (~1M rows) is loaded in section 4 only, so it is never resident
+# alongside the other datasets' cleaning intermediates
 
 print(f"[OK] order_reviews: {df_reviews.shape[0]:,} rows x {df_reviews.shape[1]} columns")
 print(f"[OK] orders: {df_orders.shape[0]:,} rows x {df_orders.shape[1]} columns")
 print(f"[OK] products: {df_products.shape[0]:,} rows x {df_products.shape[1]} columns")
-print(f"[OK] geolocation: {df_geolocation.shape[0]:,} rows x {df_geolocation.shape[1]} columns")
+
+# Shapes captured at load time, reused by the cleaning summary
+original_shapes = {
+    'order_reviews': df_reviews.shape,
+    'orders': df_orders.shape,
+    'products': df_products.shape
+}
 
 # Prepare cleaning report collector
 report_entries = []
+# Single timestamp for the whole cleaning pass
+now_iso = datetime.now().isoformat()
+# Shapes of the files written by this run (reused by the final report instead of re-reading them)
+saved_shapes = {}
 
 # 1. Clean order_reviews dataset
 print("\n" + "="*80)
@@ -41,9 +53,11 @@ print(f"  Missing values:\n{df_reviews.isnull().sum()}")
 
 # Fill missing values with "no comment"
 # These columns are related to review_score and should be kept
-df_reviews_clean = df_reviews.copy()
-df_reviews_clean['review_comment_title'] = df_reviews_clean['review_comment_title'].fillna('no comment')
-df_reviews_clean['review_comment_message'] = df_reviews_clean['review_comment_message'].fillna('no comment')
+# (single fillna call: returns a new frame, no defensive copy needed)
+df_reviews_clean = df_reviews.fillna({
+    'review_comment_title': 'no comment',
+    'review_comment_message': 'no comment'
+})
 
 print(f"\nFilled missing values with 'no comment':")
 print(f"  - review_comment_title")
@@ -59,7 +73,7 @@ df_reviews_clean = df_reviews_clean.drop_duplicates()
 removed_reviews = before_reviews - len(df_reviews_clean)
 if removed_reviews:
     report_entries.append({
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': now_iso,
         'dataset': 'order_reviews',
         'action': 'drop_duplicates',
         'removed': int(removed_reviews),
@@ -69,6 +83,7 @@ if removed_reviews:
 
 # Save cleaned dataset
 df_reviews_clean.to_csv(os.path.join(PROCESSED_DATA_CLEANED_PATH, 'olist_order_reviews_clean.csv'), index=False)
+saved_shapes['olist_order_reviews_clean.csv'] = df_reviews_clean.shape
 print(f"[OK] Saved: {os.path.join(PROCESSED_DATA_CLEANED_PATH, 'olist_order_reviews_clean.csv')}")
 
 # 2. Clean products dataset
@@ -77,7 +92,7 @@ print("2. CLEANING PRODUCTS DATASET")
 print("="*80)
 
 df_products['product_category_name'] = df_products['product_category_name'].fillna('unknown')
-df_products.to_csv(os.path.join(PROCESSED_DATA_CLEANED_PATH, 'olist_products_clean.csv'), index=False)
+print(f"  Imputed product_category_name with 'unknown' (where missing)")
 print("\nBefore cleaning:")
 print(f"  Missing values:\n{df_products.isnull().sum()}")
 
@@ -86,7 +101,7 @@ remove_product_id = '5eb564652db742ff8f28759cd8d2652a'
 if remove_product_id in df_products['product_id'].values:
     df_products = df_products[df_products['product_id'] != remove_product_id].reset_index(drop=True)
     report_entries.append({
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': now_iso,
         'dataset': 'products',
         'action': 'remove_product_id',
         'removed': 1,
@@ -107,19 +122,18 @@ df_products = df_products.rename(columns={
 })
 bebes_cols = ['product_weight_g', 'product_length_cm', 'product_height_cm', 'product_width_cm']
 
-# Ensure category column exists and fill unknowns
-df_products['product_category_name'] = df_products['product_category_name'].fillna('unknown')
-print(f"  Imputed product_category_name with 'unknown' (where missing)")
-
 # Compute medians for 'bebes' and apply to rows in that category
 mask_bebes = df_products['product_category_name'].str.lower() == 'bebes'
 if mask_bebes.any():
     medians_bebes = df_products.loc[mask_bebes, bebes_cols].median()
+    # Impute in a single pass over the 2D block ('bebes' rows x dimension columns)
+    bebes_values = df_products.loc[mask_bebes, bebes_cols].to_numpy(dtype=np.float64)
+    bebes_values = np.where(np.isnan(bebes_values), medians_bebes.to_numpy(), bebes_values)
+    df_products.loc[mask_bebes, bebes_cols] = bebes_values
     for col in bebes_cols:
         median_value = medians_bebes[col]
-        df_products.loc[mask_bebes, col] = df_products.loc[mask_bebes, col].fillna(median_value)
         report_entries.append({
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso,
             'dataset': 'products',
             'action': 'impute_category_median',
             'removed': 0,
@@ -129,13 +143,14 @@ if mask_bebes.any():
 else:
     print("  Category 'bebes' not found — skipping category-based imputation")
 
-# Impute remaining global numeric columns with dataset median
+# Impute remaining global numeric columns with dataset median, rounded half up to a whole
+# length so the imputed values fit the integer downcast below (and match the reported median)
 for col in global_numeric_cols:
     if col in df_products.columns:
-        median_value = df_products[col].median()
+        median_value = float(np.floor(df_products[col].median() + 0.5))
         df_products[col] = df_products[col].fillna(median_value)
         report_entries.append({
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso,
             'dataset': 'products',
             'action': 'impute_global_median',
             'removed': 0,
@@ -152,7 +167,7 @@ df_products = df_products.drop_duplicates()
 removed_products = before_products - len(df_products)
 if removed_products:
     report_entries.append({
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': now_iso,
         'dataset': 'products',
         'action': 'drop_duplicates',
         'removed': int(removed_products),
@@ -160,8 +175,21 @@ if removed_products:
     })
     print(f"  Removed {removed_products} exact duplicate row(s) from products")
 
+# Downcast numeric columns (grams/cm and text lengths fit in 32-bit or narrower types).
+# product_photos_qty is not imputed and keeps its NaNs, so it goes to float32 (exact for small counts)
+df_products = df_products.astype({
+    'product_weight_g': 'float32',
+    'product_length_cm': 'float32',
+    'product_height_cm': 'float32',
+    'product_width_cm': 'float32',
+    'product_photos_qty': 'float32',
+    'product_name_length': 'int16',
+    'product_description_length': 'int32'
+})
+
 # Save cleaned dataset
 df_products.to_csv(os.path.join(PROCESSED_DATA_CLEANED_PATH, 'olist_products_clean.csv'), index=False)
+saved_shapes['olist_products_clean.csv'] = df_products.shape
 print(f"[OK] Saved: {os.path.join(PROCESSED_DATA_CLEANED_PATH, 'olist_products_clean.csv')}")
 
 # 3. Clean orders dataset
@@ -190,7 +218,7 @@ df_orders = df_orders.drop_duplicates()
 removed_orders = before_orders - len(df_orders)
 if removed_orders:
     report_entries.append({
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': now_iso,
         'dataset': 'orders',
         'action': 'drop_duplicates',
         'removed': int(removed_orders),
@@ -200,6 +228,7 @@ if removed_orders:
 
 # Save orders dataset (unchanged, but documented)
 df_orders.to_csv(os.path.join(PROCESSED_DATA_CLEANED_PATH, 'olist_orders_clean.csv'), index=False)
+saved_shapes['olist_orders_clean.csv'] = df_orders.shape
 print(f"[OK] Saved: {os.path.join(PROCESSED_DATA_CLEANED_PATH, 'olist_orders_clean.csv')}")
 
 # 4. Clean geolocation dataset
@@ -207,18 +236,35 @@ print("\n" + "="*80)
 print("4. CLEANING GEOLOCATION DATASET")
 print("="*80)
 
+# Parsed with the multi-threaded Arrow reader
+df_geolocation = pd.read_csv(os.path.join(RAW_DATA_PATH, 'olist_geolocation_dataset.csv'), engine='pyarrow')
+print(f"[OK] geolocation: {df_geolocation.shape[0]:,} rows x {df_geolocation.shape[1]} columns")
+original_shapes['geolocation'] = df_geolocation.shape
+
+# Duplicate detection: hash the numeric key (zip prefix, lat, lng) into one uint64.
+# Rows whose hash is unique cannot be duplicates; only colliding rows go through
+# the exact (all-column) pandas duplicated() check.
+zip_bits = df_geolocation['geolocation_zip_code_prefix'].to_numpy(np.uint64)
+lat_bits = (df_geolocation['geolocation_lat'].to_numpy(np.float64) + 0.0).view(np.uint64)  # + 0.0 folds -0.0 into 0.0
+lng_bits = (df_geolocation['geolocation_lng'].to_numpy(np.float64) + 0.0).view(np.uint64)
+geo_hash = (zip_bits * np.uint64(0x9E3779B97F4A7C15)) ^ lat_bits ^ np.left_shift(lng_bits, np.uint64(1))
+_, hash_inverse, hash_counts = np.unique(geo_hash, return_inverse=True, return_counts=True)
+hash_collides = hash_counts[hash_inverse] > 1
+geo_duplicated = np.zeros(len(df_geolocation), dtype=bool)
+geo_duplicated[hash_collides] = df_geolocation[hash_collides].duplicated().to_numpy()
+dup_count = int(geo_duplicated.sum())
+
 print("\nBefore cleaning:")
 print(f"  Rows: {df_geolocation.shape[0]:,}")
-print(f"  Duplicates: {df_geolocation.duplicated().sum():,} ({round((df_geolocation.duplicated().sum() / df_geolocation.shape[0]) * 100, 2)}%)")
+print(f"  Duplicates: {dup_count:,} ({round((dup_count / df_geolocation.shape[0]) * 100, 2)}%)")
 
-df_geolocation_clean = df_geolocation.drop_duplicates()
 # Remove duplicates
 before_geo = len(df_geolocation)
-df_geolocation_clean = df_geolocation.drop_duplicates()
+df_geolocation_clean = df_geolocation[~geo_duplicated]
 removed_geo = before_geo - len(df_geolocation_clean)
 if removed_geo:
     report_entries.append({
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': now_iso,
         'dataset': 'geolocation',
         'action': 'drop_duplicates',
         'removed': int(removed_geo),
@@ -231,8 +277,13 @@ print(f"  Duplicates removed: {removed_geo}")
 
 # Save cleaned dataset
 df_geolocation_clean.to_csv(os.path.join(PROCESSED_DATA_CLEANED_PATH, 'olist_geolocation_clean.csv'), index=False)
+saved_shapes['olist_geolocation_clean.csv'] = df_geolocation_clean.shape
 print(f"[OK] Saved: {os.path.join(PROCESSED_DATA_CLEANED_PATH, 'olist_geolocation_clean.csv')}")
 
+# Release the geolocation frames and hash buffers; only their shapes are needed below
+del df_geolocation, df_geolocation_clean
+del zip_bits, lat_bits, lng_bits, geo_hash, hash_inverse, hash_counts, hash_collides, geo_duplicated
+
 # 5. Copy other datasets (no cleaning needed)
 print("\n" + "="*80)
 print("5. COPYING OTHER DATASETS (NO CLEANING NEEDED)")
@@ -254,10 +305,11 @@ for name, filename in other_datasets.items():
     removed_other = before_other - len(df)
     output_filename = filename.replace('.csv', '_clean.csv')
     df.to_csv(os.path.join(PROCESSED_DATA_CLEANED_PATH, output_filename), index=False)
+    saved_shapes[output_filename] = df.shape
     print(f"[OK] Copied {name} -> {output_filename} (removed {removed_other} duplicates)")
     if removed_other:
         report_entries.append({
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso,
             'dataset': name,
             'action': 'drop_duplicates',
             'removed': int(removed_other),
@@ -272,8 +324,8 @@ print("="*80)
 cleaning_summary = [
     {
         'Dataset': 'order_reviews',
-        'Original_Rows': df_reviews.shape[0],
-        'Original_Columns': df_reviews.shape[1],
+        'Original_Rows': original_shapes['order_reviews'][0],
+        'Original_Columns': original_shapes['order_reviews'][1],
         'Cleaned_Rows': df_reviews_clean.shape[0],
         'Cleaned_Columns': df_reviews_clean.shape[1],
         'Columns_Dropped': 0,
@@ -281,8 +333,8 @@ cleaning_summary = [
     },
     {
         'Dataset': 'products',
-        'Original_Rows': df_products.shape[0],
-        'Original_Columns': df_products.shape[1],
+        'Original_Rows': original_shapes['products'][0],
+        'Original_Columns': original_shapes['products'][1],
         'Cleaned_Rows': df_products.shape[0],
         'Cleaned_Columns': df_products.shape[1],
         'Columns_Dropped': 0,
@@ -290,8 +342,8 @@ cleaning_summary = [
     },
     {
         'Dataset': 'orders',
-        'Original_Rows': df_orders.shape[0],
-        'Original_Columns': df_orders.shape[1],
+        'Original_Rows': original_shapes['orders'][0],
+        'Original_Columns': original_shapes['orders'][1],
         'Cleaned_Rows': df_orders.shape[0],
         'Cleaned_Columns': df_orders.shape[1],
         'Columns_Dropped': 0,
@@ -299,12 +351,12 @@ cleaning_summary = [
     },
     {
         'Dataset': 'geolocation',
-        'Original_Rows': df_geolocation.shape[0],
-        'Original_Columns': df_geolocation.shape[1],
-        'Cleaned_Rows': df_geolocation_clean.shape[0],
-        'Cleaned_Columns': df_geolocation_clean.shape[1],
+        'Original_Rows': original_shapes['geolocation'][0],
+        'Original_Columns': original_shapes['geolocation'][1],
+        'Cleaned_Rows': saved_shapes['olist_geolocation_clean.csv'][0],
+        'Cleaned_Columns': saved_shapes['olist_geolocation_clean.csv'][1],
         'Columns_Dropped': 0,
-        'Action': f'Removed {df_geolocation.duplicated().sum():,} duplicates'
+        'Action': f'Removed {dup_count:,} duplicates'
     }
 ]
 
@@ -340,11 +392,8 @@ with open(report_path, 'w', encoding='utf-8') as f:
     f.write("="*80 + "\n\n")
     f.write(f"Cleaned datasets saved to: {PROCESSED_DATA_CLEANED_PATH}\n\n")
     f.write("Files created:\n")
-    for filename in os.listdir(PROCESSED_DATA_CLEANED_PATH):
-        if filename.endswith('_clean.csv'):
-            filepath = os.path.join(PROCESSED_DATA_CLEANED_PATH, filename)
-            df = pd.read_csv(filepath)
-            f.write(f"  - {filename}: {df.shape[0]:,} rows x {df.shape[1]} columns\n")
+    for filename, (n_rows, n_cols) in saved_shapes.items():
+        f.write(f"  - {filename}: {n_rows:,} rows x {n_cols} columns\n")
     f.write(f"\nCleaning completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
     f.write("Next Steps:\n")
     f.write("  1. Validate cleaned datasets\n")
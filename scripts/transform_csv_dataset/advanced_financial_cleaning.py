@@ -8,6 +8,9 @@ import numpy as np
 import os
 import yaml
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from raw_data_cache import load_cached
+from financial_core import build_financial_join
 
 def load_configuration():
     """Charge la configuration depuis le fichier YAML"""
@@ -37,51 +40,69 @@ def advanced_data_cleaning():
     # Charger les données
     print("   Chargement des données...")
     
-    # Charger les données de base
+    # Charger les données de base (seules les tables utilisées par les corrections)
     orders_file = os.path.join(RAW_DATA_PATH, 'olist_orders_dataset.csv')
     order_items_file = os.path.join(RAW_DATA_PATH, 'olist_order_items_dataset.csv')
     order_payments_file = os.path.join(RAW_DATA_PATH, 'olist_order_payments_dataset.csv')
-    order_reviews_file = os.path.join(RAW_DATA_PATH, 'olist_order_reviews_dataset.csv')
-    customers_file = os.path.join(RAW_DATA_PATH, 'olist_customers_dataset.csv')
-    sellers_file = os.path.join(RAW_DATA_PATH, 'olist_sellers_dataset.csv')
     
-    orders = pd.read_csv(orders_file)
-    order_items = pd.read_csv(order_items_file)
-    order_payments = pd.read_csv(order_payments_file)
-    order_reviews = pd.read_csv(order_reviews_file)
-    customers = pd.read_csv(customers_file)
-    sellers = pd.read_csv(sellers_file)
+    # Lecture via le moteur pyarrow, mise en cache Feather pour les relances ;
+    # order_id en chaînes Arrow (hachage natif pour les jointures/isin/groupby) et
+    # order_status, peu cardinal, en catégorie.
+    # Montants en float32 et compteurs en int16 : moitié moins d'octets à parcourir dans les
+    # groupby/jointures, précision largement suffisante pour des montants à 2 décimales.
+    # Horodatages gardés en texte, tels que dans les CSV bruts (pas de conversion en datetime)
+    tables_to_load = {
+        'orders': (orders_file, {
+            'order_id': 'string[pyarrow]', 'order_status': 'category',
+            'order_purchase_timestamp': str, 'order_approved_at': str, 'order_delivered_carrier_date': str,
+            'order_delivered_customer_date': str, 'order_estimated_delivery_date': str
+        }),
+        'order_items': (order_items_file, {
+            'order_id': 'string[pyarrow]', 'order_item_id': 'int16', 'price': 'float32', 'freight_value': 'float32',
+            'shipping_limit_date': str
+        }),
+        'order_payments': (order_payments_file, {
+            'order_id': 'string[pyarrow]', 'payment_sequential': 'int16', 'payment_installments': 'int16', 'payment_value': 'float32'
+        }),
+    }
+    
+    # Les tables sont indépendantes : chargement concurrent (le parsing pyarrow libère le GIL)
+    with ThreadPoolExecutor(max_workers=len(tables_to_load)) as executor:
+        loaded = dict(zip(tables_to_load, executor.map(lambda args: load_cached(*args), tables_to_load.values())))
+    orders, order_items, order_payments = loaded['orders'], loaded['order_items'], loaded['order_payments']
     
     print(f"   - Orders: {len(orders):,} enregistrements")
     print(f"   - Order Items: {len(order_items):,} enregistrements")
     print(f"   - Order Payments: {len(order_payments):,} enregistrements")
     
-    # Sauvegarder les données originales avant modification
-    original_orders = orders.copy()
-    original_order_items = order_items.copy()
-    original_order_payments = order_payments.copy()
+    # Jointure commandes / items / paiements sur les tables brutes, construite avant toute
+    # correction et partagée avec detect_clean_financial_anomalies via orders_with_financials.parquet
+    financial_join = build_financial_join(orders, order_items, order_payments)
     
     # ============================================================================
     # 1. CORRECTION IMMEDIATE : Suppression de la commande corrompue
     # ============================================================================
     print("\n   CORRECTION 1: Suppression de la commande corrompue (shipped sans items)")
     
-    # Identifier la commande corrompue (shipped sans items)
-    orders_with_items = set(order_items['order_id'].unique())
-    shipped_orders = set(orders[orders['order_status'] == 'shipped']['order_id'])
-    corrupted_orders = shipped_orders - orders_with_items
+    # Identifier la commande corrompue (shipped sans items) par différence d'Index
+    # (table de hachage construite une fois, ordre d'apparition conservé)
+    items_idx = pd.Index(order_items['order_id'].unique())
+    shipped_idx = pd.Index(orders.loc[orders['order_status'].eq('shipped'), 'order_id'])
+    corrupted_orders = shipped_idx.difference(items_idx, sort=False)
     
     print(f"   - Commandes shipped sans items: {len(corrupted_orders)}")
     
-    if corrupted_orders:
+    if not corrupted_orders.empty:
         # Supprimer les commandes corrompues des données
-        orders_cleaned = orders[~orders['order_id'].isin(corrupted_orders)].copy()
+        orders_cleaned = orders[~orders['order_id'].isin(corrupted_orders)]
         print(f"   - Commandes supprimées: {len(orders) - len(orders_cleaned)}")
         
         # Supprimer les paiements associés si existants
-        order_payments_cleaned = order_payments[~order_payments['order_id'].isin(corrupted_orders)].copy()
+        order_payments_cleaned = order_payments[~order_payments['order_id'].isin(corrupted_orders)]
         print(f"   - Paiements supprimés: {len(order_payments) - len(order_payments_cleaned)}")
     else:
+        # Copies explicites : les corrections 3 et 4 modifient order_payments_cleaned en place,
+        # les tables brutes ne doivent pas être touchées
         orders_cleaned = orders.copy()
         order_payments_cleaned = order_payments.copy()
         print("   - Aucune commande corrompue trouvée")
@@ -91,21 +112,28 @@ def advanced_data_cleaning():
     # ============================================================================
     print("\n   CORRECTION 2: Documentation de la commande livrée sans paiement")
     
-    # Identifier la commande livrée sans paiement
-    orders_with_payments = set(order_payments_cleaned['order_id'].unique())
-    delivered_orders = set(orders_cleaned[orders_cleaned['order_status'] == 'delivered']['order_id'])
-    delivered_no_payment = delivered_orders - orders_with_payments
+    # Identifier la commande livrée sans paiement par filtrage isin, dans l'ordre des commandes
+    # (les exemples affichés restent comparables d'une exécution à l'autre)
+    delivered_no_payment_mask = (
+        orders_cleaned['order_status'].eq('delivered') &
+        ~orders_cleaned['order_id'].isin(order_payments_cleaned['order_id'])
+    )
+    delivered_no_payment = pd.Index(orders_cleaned.loc[delivered_no_payment_mask, 'order_id'])
     
     print(f"   - Commandes delivered sans paiement: {len(delivered_no_payment)}")
     
-    # Créer une colonne pour documenter les exceptions
-    orders_cleaned['is_gift_order'] = orders_cleaned['order_id'].isin(delivered_no_payment)
-    orders_cleaned['gift_reason'] = None
-    orders_cleaned.loc[orders_cleaned['order_id'].isin(delivered_no_payment), 'gift_reason'] = 'acquisition_marketing'
+    # Créer les colonnes documentant les exceptions (jointure gauche sur une petite table de flags)
+    gift_flags = pd.DataFrame({
+        'order_id': delivered_no_payment.array,
+        'is_gift_order': True,
+        'gift_reason': 'acquisition_marketing'
+    })
+    orders_cleaned = orders_cleaned.merge(gift_flags, on='order_id', how='left', validate='1:1')
+    orders_cleaned['is_gift_order'] = orders_cleaned['is_gift_order'].eq(True)
     
-    if delivered_no_payment:
+    if not delivered_no_payment.empty:
         print(f"   - Commandes documentées comme exceptions: {len(delivered_no_payment)}")
-        for order_id in list(delivered_no_payment)[:5]:  # Afficher les 5 premières
+        for order_id in delivered_no_payment[:5]:  # Afficher les 5 premières
             print(f"     - {order_id}")
     
     # ============================================================================
@@ -146,32 +174,26 @@ def advanced_data_cleaning():
     print("\n   CORRECTION 5: Ajout des colonnes pour réconciliation fiscale")
     
     # Ajouter une estimation des taxes ICMS basée sur l'analyse
-    # Calculer les totaux par commande pour estimer les écarts dus aux taxes
-    item_totals = order_items.groupby('order_id').agg({
-        'price': 'sum',
-        'freight_value': 'sum'
-    }).rename(columns={'price': 'item_subtotal', 'freight_value': 'freight_subtotal'}).reset_index()
-    
-    payment_totals = order_payments_cleaned.groupby('order_id').agg({
-        'payment_value': 'sum'
-    }).rename(columns={'payment_value': 'payment_total'}).reset_index()
-    
-    # Fusionner pour calculer les écarts
-    reconciliation = item_totals.merge(payment_totals, on='order_id', how='inner')
-    reconciliation['subtotal'] = reconciliation['item_subtotal'] + reconciliation['freight_subtotal']
+    # Agrégats de paiement nettoyés calculés en une seule passe (pour l'analyse 6)
+    payment_agg = order_payments_cleaned.groupby('order_id', sort=False, observed=True).agg(
+        payment_total=('payment_value', 'sum'),
+        payment_count=('payment_value', 'size')
+    )
+    
+    # Commandes ayant à la fois des items et des paiements, pour calculer les écarts
+    reconciliation = financial_join.loc[
+        financial_join['item_count'].notna() & financial_join['payment_count'].notna(),
+        ['order_id', 'order_total', 'payment_total']
+    ].rename(columns={'order_total': 'subtotal'})
     reconciliation['difference'] = reconciliation['payment_total'] - reconciliation['subtotal']
     
     # Estimer les taxes ICMS (approximation basée sur l'analyse)
     # Pour simplifier, on suppose que les écarts positifs sont dus aux taxes
-    reconciliation['estimated_icms'] = reconciliation['difference'].apply(lambda x: max(0, x))
-    
-    # Créer un mapping pour les taxes estimées
-    icms_mapping = reconciliation.set_index('order_id')['estimated_icms'].to_dict()
+    reconciliation['estimated_icms'] = reconciliation['difference'].clip(lower=0)
     
     # Ajouter la colonne icms_value à order_items (répartie proportionnellement)
-    order_items_cleaned = order_items.copy()
-    order_items_cleaned['icms_value'] = 0.0
-    order_items_cleaned['is_gift_item'] = False  # Ajout de la colonne recommandée
+    # et la colonne recommandée is_gift_item, sans copie intermédiaire de la table
+    order_items_cleaned = order_items.assign(icms_value=0.0, is_gift_item=False)
     
     # ============================================================================
     # 6. ANALYSE DES VOUCHERS FRACTIONNES (Documentation)
@@ -179,33 +201,38 @@ def advanced_data_cleaning():
     print("\n   ANALYSE 6: Documentation des patterns vouchers fractionnés")
     
     # Identifier les commandes avec de nombreux paiements (vouchers fractionnés)
-    payment_counts = order_payments_cleaned.groupby('order_id').size().reset_index(name='payment_count')
-    fragmented_vouchers = payment_counts[payment_counts['payment_count'] > 10]
+    fragmented_vouchers = payment_agg.query('payment_count > 10')
     
     print(f"   - Commandes avec >10 paiements (vouchers fractionnés): {len(fragmented_vouchers)}")
     
     # Ajouter un indicateur pour ces commandes
-    orders_cleaned['has_fragmented_vouchers'] = orders_cleaned['order_id'].isin(
-        fragmented_vouchers['order_id']
-    )
+    fragmented_flags = pd.DataFrame({
+        'order_id': fragmented_vouchers.index,
+        'has_fragmented_vouchers': True
+    })
+    orders_cleaned = orders_cleaned.merge(fragmented_flags, on='order_id', how='left', validate='1:1')
+    orders_cleaned['has_fragmented_vouchers'] = orders_cleaned['has_fragmented_vouchers'].eq(True)
     
     # ============================================================================
     # 7. EXPORT DES DONNÉES NETTOYÉES
     # ============================================================================
     print("\n   EXPORT DES DONNÉES NETTOYÉES...")
     
-    # Sauvegarder les données nettoyées
-    orders_output = os.path.join(output_dir, "orders_advanced_cleaned.csv")
-    order_items_output = os.path.join(output_dir, "order_items_advanced_cleaned.csv")
-    order_payments_output = os.path.join(output_dir, "order_payments_advanced_cleaned.csv")
-    
-    orders_cleaned.to_csv(orders_output, index=False)
-    order_items_cleaned.to_csv(order_items_output, index=False)
-    order_payments_cleaned.to_csv(order_payments_output, index=False)
-    
-    print(f"   - orders_advanced_cleaned.csv: {len(orders_cleaned):,} lignes")
-    print(f"   - order_items_advanced_cleaned.csv: {len(order_items_cleaned):,} lignes")
-    print(f"   - order_payments_advanced_cleaned.csv: {len(order_payments_cleaned):,} lignes")
+    # Sauvegarder les données nettoyées (Parquet compressé zstd ; le petit rapport reste en CSV)
+    orders_output = os.path.join(output_dir, "orders_advanced_cleaned.parquet")
+    order_items_output = os.path.join(output_dir, "order_items_advanced_cleaned.parquet")
+    order_payments_output = os.path.join(output_dir, "order_payments_advanced_cleaned.parquet")
+    
+    parquet_options = dict(engine='pyarrow', compression='zstd', index=False, row_group_size=64_000)
+    orders_cleaned.to_parquet(orders_output, **parquet_options)
+    order_items_cleaned.to_parquet(order_items_output, **parquet_options)
+    order_payments_cleaned.to_parquet(order_payments_output, **parquet_options)
+    financial_join.to_parquet(os.path.join(output_dir, "orders_with_financials.parquet"), **parquet_options)
+    
+    print(f"   - orders_advanced_cleaned.parquet: {len(orders_cleaned):,} lignes")
+    print(f"   - order_items_advanced_cleaned.parquet: {len(order_items_cleaned):,} lignes")
+    print(f"   - order_payments_advanced_cleaned.parquet: {len(order_payments_cleaned):,} lignes")
+    print(f"   - orders_with_financials.parquet: {len(financial_join):,} lignes")
     
     # ============================================================================
     # 8. RAPPORT DE NETTOYAGE
@@ -10,11 +10,20 @@ import numpy as np
 import os
 import yaml
 from scipy import stats
-from collections import Counter
+from raw_data_cache import load_cached
 import warnings
 
 warnings.filterwarnings('ignore')
 
+# Noms de colonnes acceptés pour chaque colonne requise, par ordre de préférence
+COLUMN_ALIASES = {
+    'zip_code_prefix': ['geolocation_zip_code_prefix', 'zip_code_prefix', 'customer_zip_code_prefix'],
+    'latitude': ['geolocation_lat', 'lat', 'latitude'],
+    'longitude': ['geolocation_lng', 'lng', 'longitude', 'geolocation_long'],
+    'city': ['geolocation_city', 'city', 'customer_city'],
+    'state': ['geolocation_state', 'state', 'customer_state']
+}
+
 def load_configuration():
     """Charge la configuration depuis le fichier YAML"""
     with open('config/config.yaml', 'r') as f:
@@ -26,18 +35,6 @@ def load_configuration():
     
     return RAW_DATA_PATH, PROCESSED_DATA_PATH, REPORTS_PATH
 
-def get_canonical_city_name(city_series):
-    """
-    Retourne le nom canonique d'une ville (celui qui apparaît le plus fréquemment)
-    """
-    if len(city_series) == 0:
-        return None
-    
-    # Compter les occurrences de chaque nom de ville
-    city_counts = Counter(city_series)
-    # Retourner le nom le plus fréquent
-    return city_counts.most_common(1)[0][0]
-
 def create_zip_code_reference():
     """Crée la table de référence géographique optimisée"""
     
@@ -51,7 +48,17 @@ def create_zip_code_reference():
     # Charger les données de géolocalisation
     print("Chargement des données de géolocalisation...")
     geolocation_file = os.path.join(RAW_DATA_PATH, 'olist_geolocation_dataset.csv')
-    df_geo = pd.read_csv(geolocation_file)
+    # Lecture multi-threadée via le moteur pyarrow, mise en cache Feather pour les relances ;
+    # types compacts dès la lecture : préfixe en uint32 et ville/état en catégories (le groupby
+    # hache des codes entiers plutôt que des chaînes). Les coordonnées restent en float64 pour
+    # les agrégats et les étendues en km ; elles ne passent en float32 qu'à l'enregistrement
+    df_geo = load_cached(geolocation_file, dtype={
+        'geolocation_zip_code_prefix': 'uint32',
+        'geolocation_lat': 'float64',
+        'geolocation_lng': 'float64',
+        'geolocation_city': 'category',
+        'geolocation_state': 'category'
+    })
     
     print(f"[OK] Données chargées: {df_geo.shape[0]:,} lignes x {df_geo.shape[1]} colonnes")
     
@@ -63,98 +70,82 @@ def create_zip_code_reference():
     # Regrouper par préfixe de code postal et état
     print("\nRegroupement des données par préfixe de code postal et état...")
     
-    # Renommer les colonnes pour correspondre à la structure attendue
-    df_geo_renamed = df_geo.rename(columns={
-        'geolocation_zip_code_prefix': 'zip_code_prefix',
-        'geolocation_lat': 'latitude',
-        'geolocation_lng': 'longitude',
-        'geolocation_city': 'city',
-        'geolocation_state': 'state'
-    })
-    
-    # S'assurer que les colonnes nécessaires existent
-    required_cols = ['zip_code_prefix', 'state', 'city', 'latitude', 'longitude']
-    for col in required_cols:
-        if col not in df_geo_renamed.columns:
-            print(f"ATTENTION: Colonne '{col}' non trouvée dans les données")
-            if col == 'zip_code_prefix':
-                # Essayer différentes variantes de nommage
-                for alt_col in ['geolocation_zip_code_prefix', 'zip_code_prefix', 'customer_zip_code_prefix']:
-                    if alt_col in df_geo.columns:
-                        df_geo_renamed = df_geo.rename(columns={alt_col: 'zip_code_prefix'})
-                        break
-            elif col == 'latitude':
-                for alt_col in ['geolocation_lat', 'lat', 'latitude']:
-                    if alt_col in df_geo.columns:
-                        df_geo_renamed = df_geo.rename(columns={alt_col: 'latitude'})
-                        break
-            elif col == 'longitude':
-                for alt_col in ['geolocation_lng', 'lng', 'longitude', 'geolocation_long']:
-                    if alt_col in df_geo.columns:
-                        df_geo_renamed = df_geo.rename(columns={alt_col: 'longitude'})
-                        break
-            elif col == 'city':
-                for alt_col in ['geolocation_city', 'city', 'customer_city']:
-                    if alt_col in df_geo.columns:
-                        df_geo_renamed = df_geo.rename(columns={alt_col: 'city'})
-                        break
-            elif col == 'state':
-                for alt_col in ['geolocation_state', 'state', 'customer_state']:
-                    if alt_col in df_geo.columns:
-                        df_geo_renamed = df_geo.rename(columns={alt_col: 'state'})
-                        break
-    
-    # Vérifier à nouveau les colonnes requises
+    # Renommer les colonnes pour correspondre à la structure attendue : pour chaque nom
+    # canonique, premier alias présent dans le fichier, puis un seul rename
+    available_cols = set(df_geo.columns)
+    rename_map = {}
+    for canonical_col, aliases in COLUMN_ALIASES.items():
+        found_col = next((alias for alias in aliases if alias in available_cols), None)
+        if found_col is None:
+            print(f"ATTENTION: Colonne '{canonical_col}' non trouvée dans les données")
+        else:
+            rename_map[found_col] = canonical_col
+    df_geo_renamed = df_geo.rename(columns=rename_map)
+    required_cols = list(COLUMN_ALIASES)
+    
+    # Vérifier les colonnes requises
     missing_cols = [col for col in required_cols if col not in df_geo_renamed.columns]
     if missing_cols:
         print(f"ERREUR: Colonnes manquantes: {missing_cols}")
         print(f"Colonnes disponibles: {list(df_geo_renamed.columns)}")
         return
     
-    # Supprimer les lignes avec des valeurs manquantes critiques
-    df_geo_clean = df_geo_renamed.dropna(subset=['zip_code_prefix', 'latitude', 'longitude'])
+    # Supprimer les lignes avec des valeurs manquantes critiques : un seul masque NumPy
+    # sur les coordonnées (le préfixe, lu en uint32, ne peut pas être manquant)
+    valid_coords = (
+        np.isfinite(df_geo_renamed['latitude'].to_numpy()) &
+        np.isfinite(df_geo_renamed['longitude'].to_numpy())
+    )
+    if not pd.api.types.is_integer_dtype(df_geo_renamed['zip_code_prefix']):
+        valid_coords &= df_geo_renamed['zip_code_prefix'].notna().to_numpy()
+    df_geo_clean = df_geo_renamed[valid_coords]
     print(f"Données nettoyées: {df_geo_clean.shape[0]:,} lignes restantes")
     
-    # Fonction pour obtenir le nom canonique et le nombre de variations pour chaque groupe
-    def get_city_stats(group):
-        canonical_name = get_canonical_city_name(group['city'])
-        variation_count = group['city'].nunique()
-        return pd.Series({
-            'canonical_city_name': canonical_name,
-            'city_name_variations': variation_count,
-            'avg_latitude': group['latitude'].mean(),
-            'latitude_stddev': group['latitude'].std(),
-            'min_latitude': group['latitude'].min(),
-            'max_latitude': group['latitude'].max(),
-            'avg_longitude': group['longitude'].mean(),
-            'longitude_stddev': group['longitude'].std(),
-            'min_longitude': group['longitude'].min(),
-            'max_longitude': group['longitude'].max(),
-            'coordinate_samples': len(group)
-        })
-    
-    # Appliquer la fonction de regroupement
-    grouped = df_geo_clean.groupby(['zip_code_prefix', 'state']).apply(get_city_stats).reset_index()
-    
-    # Calculer l'étendue géographique en km
-    # 1 degré de latitude ≈ 111 km
-    grouped['lat_spread_km'] = (grouped['max_latitude'] - grouped['min_latitude']) * 111
-    # Pour la longitude, on ajuste selon la latitude moyenne
-    grouped['lon_spread_km'] = (grouped['max_longitude'] - grouped['min_longitude']) * 111 * np.cos(np.radians(grouped['avg_latitude']))
-    
-    # Arrondir les valeurs pour plus de lisibilité
-    grouped['lat_spread_km'] = grouped['lat_spread_km'].round(2)
-    grouped['lon_spread_km'] = grouped['lon_spread_km'].round(2)
-    
-    # Déterminer la qualité des données
-    conditions = [
-        grouped['coordinate_samples'] >= 50,
-        (grouped['coordinate_samples'] >= 10) & (grouped['coordinate_samples'] < 50),
-        grouped['coordinate_samples'] < 10
-    ]
-    choices = ['High', 'Medium', 'Low']
-    # np.select requires the default to be compatible with choices dtype (strings)
-    grouped['data_quality'] = np.select(conditions, choices, default='Low')
+    # Agrégations vectorielles par préfixe/état (noyaux Cython de groupby, sans apply par groupe)
+    geo_groups = df_geo_clean.groupby(['zip_code_prefix', 'state'], sort=False, observed=True)
+    grouped = geo_groups.agg(
+        avg_latitude=('latitude', 'mean'),
+        latitude_stddev=('latitude', 'std'),
+        min_latitude=('latitude', 'min'),
+        max_latitude=('latitude', 'max'),
+        avg_longitude=('longitude', 'mean'),
+        longitude_stddev=('longitude', 'std'),
+        min_longitude=('longitude', 'min'),
+        max_longitude=('longitude', 'max'),
+        coordinate_samples=('city', 'size'),
+        city_name_variations=('city', 'nunique')
+    )
+    
+    # Nom canonique = ville la plus fréquente du groupe : comptage par (préfixe, état, ville),
+    # tri stable décroissant puis première ligne par groupe (à égalité, la première ville rencontrée)
+    city_counts = df_geo_clean.groupby(['zip_code_prefix', 'state', 'city'], sort=False, observed=True).size()
+    canonical_cities = (
+        city_counts.reset_index(name='n')
+        .sort_values('n', ascending=False, kind='stable')
+        .drop_duplicates(['zip_code_prefix', 'state'])
+        .set_index(['zip_code_prefix', 'state'])['city']
+    )
+    grouped['canonical_city_name'] = canonical_cities
+    grouped = grouped.reset_index()
+    
+    # Calculer l'étendue géographique en km, en une seule expression évaluée par
+    # DataFrame.eval (NumExpr s'il est installé, sinon moteur Python)
+    # 1 degré de latitude ≈ 111 km ; pour la longitude, on ajuste selon la latitude moyenne
+    grouped.eval(
+        """
+        lat_spread_km = (max_latitude - min_latitude) * 111
+        lon_spread_km = (max_longitude - min_longitude) * 111 * cos(avg_latitude * 0.017453292519943295)
+        """,
+        inplace=True
+    )
+    
+    # Arrondir les valeurs pour plus de lisibilité (un seul appel pour les deux colonnes)
+    grouped = grouped.round({'lat_spread_km': 2, 'lon_spread_km': 2})
+    
+    # Déterminer la qualité des données : une seule passe np.digitize sur les seuils
+    # 10 et 50 échantillons, indexant directement le tableau des libellés
+    quality_levels = np.digitize(grouped['coordinate_samples'].to_numpy(), bins=[10, 50])
+    grouped['data_quality'] = np.array(['Low', 'Medium', 'High'], dtype=object)[quality_levels]
     
     # Réorganiser les colonnes pour correspondre à la structure dbt
     final_columns = [
@@ -168,11 +159,25 @@ def create_zip_code_reference():
         'data_quality'
     ]
     
-    zip_code_ref = grouped[final_columns].copy()
+    # Les coordonnées agrégées sont stockées en float32 ; les étendues, arrondies au centième,
+    # restent en float64 pour garder leurs valeurs exactes
+    coordinate_columns = [
+        'avg_latitude', 'avg_longitude', 'min_latitude', 'max_latitude',
+        'min_longitude', 'max_longitude', 'latitude_stddev', 'longitude_stddev'
+    ]
     
-    # Remplacer les NaN dans les colonnes de déviation standard par 0
-    zip_code_ref['latitude_stddev'] = zip_code_ref['latitude_stddev'].fillna(0)
-    zip_code_ref['longitude_stddev'] = zip_code_ref['longitude_stddev'].fillna(0)
+    # État et ville repassent en texte simple : les scripts en aval complètent ces colonnes
+    # avec des valeurs hors catégories (fillna, comparaisons).
+    # Les NaN des déviations standard (groupes d'un seul point) sont remplacés par 0
+    # dans la même chaîne, sans copie intermédiaire de la projection.
+    # Le groupby ne trie pas les groupes : la table est triée une fois par (préfixe, état)
+    # pour que l'ordre des lignes ne dépende pas de celui du CSV source
+    zip_code_ref = (
+        grouped[final_columns]
+        .astype({'state': object, 'canonical_city_name': object, **dict.fromkeys(coordinate_columns, 'float32')})
+        .fillna({'latitude_stddev': 0, 'longitude_stddev': 0})
+        .sort_values(['zip_code_prefix', 'state'], ignore_index=True)
+    )
     
     print(f"\nTable de référence créée: {zip_code_ref.shape[0]:,} lignes x {zip_code_ref.shape[1]} colonnes")
     
@@ -181,16 +186,23 @@ def create_zip_code_reference():
     print(zip_code_ref.head())
     
     # Sauvegarder la table de référence
-    output_path = os.path.join(PROCESSED_DATA_PATH, 'zip_code_reference.csv')
-    zip_code_ref.to_csv(output_path, index=False)
+    # Parquet compressé : pas de formatage texte des flottants, lecture typée en aval
+    output_path = os.path.join(PROCESSED_DATA_PATH, 'zip_code_reference.parquet')
+    zip_code_ref.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
     print(f"\n[OK] Table de référence sauvegardée: {output_path}")
     
-    # Générer des statistiques
+    # Générer des statistiques (calculées une fois, réutilisées pour le rapport)
+    zip_prefix_count = zip_code_ref['zip_code_prefix'].nunique()
+    state_count = zip_code_ref['state'].nunique()
+    data_quality_counts = zip_code_ref['data_quality'].value_counts()
+    total_records = len(zip_code_ref)
+    data_quality_percentages = data_quality_counts / total_records * 100
+    
     print(f"\nStatistiques de la table de référence:")
-    print(f"- Nombre total de préfixes ZIP: {zip_code_ref['zip_code_prefix'].nunique():,}")
-    print(f"- Nombre total d'états couverts: {zip_code_ref['state'].nunique():,}")
+    print(f"- Nombre total de préfixes ZIP: {zip_prefix_count:,}")
+    print(f"- Nombre total d'états couverts: {state_count:,}")
     print(f"- Qualité des données:")
-    print(zip_code_ref['data_quality'].value_counts())
+    print(data_quality_counts)
     
     # Sauvegarder un rapport
     zip_report_dir = os.path.join(REPORTS_PATH, 'zip_code_reference')
@@ -204,16 +216,12 @@ def create_zip_code_reference():
         # Statistiques principales
         f.write("Statistiques de la table de référence:\n")
         f.write("-"*50 + "\n")
-        f.write(f"Nombre total de préfixes ZIP: {zip_code_ref['zip_code_prefix'].nunique():,}\n")
-        f.write(f"Nombre total d'états couverts: {zip_code_ref['state'].nunique():,}\n")
+        f.write(f"Nombre total de préfixes ZIP: {zip_prefix_count:,}\n")
+        f.write(f"Nombre total d'états couverts: {state_count:,}\n")
         f.write("Qualité des données:\n")
-        data_quality_counts = zip_code_ref['data_quality'].value_counts()
         for quality, count in data_quality_counts.items():
-            percentage = (count / len(zip_code_ref)) * 100
-            f.write(f"  - {quality}: {count:,} ({percentage:.1f}%)\n")
+            f.write(f"  - {quality}: {count:,} ({data_quality_percentages[quality]:.1f}%)\n")
         
-        # Calculer le nombre total de records
-        total_records = len(zip_code_ref)
         f.write(f"Total records: {total_records:,}\n")
     print(f"[OK] Rapport sauvegardé: {report_path}")
     
@@ -3,10 +3,20 @@ Script pour identifier les colonnes nécessitant des index et définir les contr
 """
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 from pathlib import Path
 import yaml
 import logging
+import os
+import re
+from collections import defaultdict
+from itertools import combinations
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Tuple, Any
+from raw_data_cache import read_csv_arrow
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -17,6 +27,52 @@ class IndexAndConstraintAnalyzer:
     Classe pour analyser les besoins en index et les contraintes d'intégrité
     """
     
+    # Groupes de mots-clés de noms de colonnes (ou de tables), testés sur le nom en minuscules
+    _GEO_RE = re.compile(r'zip_code|state|city')
+    _FILTER_RE = re.compile(r'date|status|category')
+    _MONEY_RE = re.compile(r'price|amount|freight')
+    _QTY_RE = re.compile(r'quantity|count')
+    _FK_RE = re.compile(r'id|key')
+    _FACT_TABLE_RE = re.compile(r'order|item|payment')
+    
+    # Taille de l'échantillon de pré-filtrage des clés primaires composites
+    _PK_SAMPLE_SIZE = 50_000
+    
+    # Type SQL par code de type (dtype.kind) ; les objets/chaînes et les autres types
+    # prennent VARCHAR(255) par défaut
+    _KIND_TO_SQL = {
+        'i': 'INTEGER',
+        'u': 'INTEGER',
+        'f': 'DECIMAL(15,2)',  # Pour les montants monétaires
+        'b': 'BOOLEAN',
+        'M': 'TIMESTAMP'
+    }
+    
+    # Relations spécifiques basées sur le schéma connu
+    # (basé sur les noms de colonnes et le contexte métier)
+    _SPECIFIC_RELATIONS = [
+        # Relations clientes-adresses
+        {
+            'parent_table': 'zip_code_reference',
+            'child_table': 'customers_with_geolocation',
+            'parent_column': 'zip_code_prefix',
+            'child_column': 'customer_zip_code_prefix'
+        },
+        {
+            'parent_table': 'zip_code_reference',
+            'child_table': 'sellers_with_geolocation',
+            'parent_column': 'zip_code_prefix',
+            'child_column': 'seller_zip_code_prefix'
+        },
+        # Relation commandes-paiements
+        {
+            'parent_table': 'order_financial_reconciliation',
+            'child_table': 'order_financial_reconciliation',  # Cette table contient déjà les relations
+            'parent_column': 'order_id',
+            'child_column': 'order_id'
+        }
+    ]
+    
     def __init__(self, config_path: str = 'config/config.yaml'):
         """
         Initialise l'analyseur avec la configuration
@@ -25,13 +81,40 @@ class IndexAndConstraintAnalyzer:
             self.config = yaml.safe_load(f)
         
         self.processed_data_path = Path(self.config['paths']['processed_data'])
+        # Lecture des CSV via pyarrow avec cache Parquet (désactivable avec fast_io: false)
+        self.fast_io = self.config.get('fast_io', True)
         
-    def analyze_index_needs(self, df: pd.DataFrame, table_name: str) -> Dict[str, Any]:
+    def _column_stats(self, df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+        """
+        Calcule en une passe par table les statistiques de colonnes partagées par les analyses
+        (type, nombre de nulls, cardinalité, unicité)
+        """
+        n_rows = len(df)
+        null_counts = df.isna().sum()
+        # nunique(dropna=False) compte NaN comme une valeur, comme Series.is_unique ;
+        # la cardinalité rapportée exclut les nulls, comme Series.nunique()
+        distinct_counts = df.nunique(dropna=False)
+        
+        return {
+            col: {
+                'dtype': dtype,
+                'null_count': int(null_counts[col]),
+                'nunique': int(distinct_counts[col]) - int(null_counts[col] > 0),
+                'is_unique': int(distinct_counts[col]) == n_rows
+            }
+            for col, dtype in df.dtypes.items()
+        }
+    
+    def analyze_index_needs(self, df: pd.DataFrame, table_name: str,
+                            stats: Dict[str, Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Analyse les besoins en index pour une table
         """
         logger.info(f"Analyse des besoins en index pour la table: {table_name}")
         
+        if stats is None:
+            stats = self._column_stats(df)
+        
         index_analysis = {
             'table_name': table_name,
             'candidate_indexes': [],
@@ -41,59 +124,55 @@ class IndexAndConstraintAnalyzer:
         # Identifier les colonnes candidates pour les index
         # Basé sur la cardinalité, l'utilisation dans les filtres, etc.
         
-        for col in df.columns:
-            col_info = {
-                'column': col,
-                'data_type': str(df[col].dtype),
-                'cardinality': df[col].nunique(),
-                'total_rows': len(df),
-                'cardinality_ratio': df[col].nunique() / len(df) if len(df) > 0 else 0
-            }
-            
-            # Déterminer si la colonne est candidate à un index
-            is_candidate = False
-            reasons = []
-            
+        # Noms en minuscules, cardinalités et ratios calculés une seule fois pour toute la table
+        n_rows = len(df)
+        columns = list(df.columns)
+        cols_lower = {col: col.lower() for col in columns}
+        cardinalities = np.array([stats[col]['nunique'] for col in columns], dtype=np.int64)
+        ratios = cardinalities / n_rows if n_rows > 0 else np.zeros(len(columns))
+        is_id = np.array(['id' in cols_lower[col] for col in columns], dtype=bool)
+        
+        # Raisons d'indexation par colonne ; une colonne est candidate dès qu'elle en a une
+        reason_flags = [
             # Les colonnes ID sont souvent candidates à un index
-            if 'id' in col.lower():
-                is_candidate = True
-                reasons.append('Colonne ID')
-            
-            # Les colonnes avec haute cardinalité peuvent bénéficier d'index
-            if col_info['cardinality_ratio'] > 0.01:  # Plus de 1% de valeurs uniques
-                is_candidate = True
-                reasons.append('Haute cardinalité')
-            
+            ('Colonne ID', is_id),
+            # Les colonnes avec haute cardinalité peuvent bénéficier d'index (plus de 1% de valeurs uniques)
+            ('Haute cardinalité', ratios > 0.01),
             # Les colonnes fréquemment utilisées dans les jointures
-            if any(join_col in col.lower() for join_col in ['zip_code', 'state', 'city']):
-                is_candidate = True
-                reasons.append('Utilisée dans les jointures géographiques')
-            
+            ('Utilisée dans les jointures géographiques', [bool(self._GEO_RE.search(cols_lower[col])) for col in columns]),
             # Les colonnes utilisées dans les filtres courants
-            if any(filter_col in col.lower() for filter_col in ['date', 'status', 'category']):
-                is_candidate = True
-                reasons.append('Potentiellement utilisée dans les filtres')
-            
-            if is_candidate:
-                col_info['is_index_candidate'] = True
-                col_info['reasons'] = reasons
-                
-                # Déterminer le type d'index approprié
-                if col_info['cardinality_ratio'] == 1.0 and 'id' in col.lower():
-                    col_info['recommended_index_type'] = 'PRIMARY KEY'
-                elif col_info['cardinality_ratio'] == 1.0:
-                    col_info['recommended_index_type'] = 'UNIQUE'
-                elif col_info['cardinality_ratio'] > 0.1:
-                    col_info['recommended_index_type'] = 'INDEX'
-                else:
-                    col_info['recommended_index_type'] = 'INDEX (potentiellement composite)'
-                
-                index_analysis['candidate_indexes'].append(col_info)
+            ('Potentiellement utilisée dans les filtres', [bool(self._FILTER_RE.search(cols_lower[col])) for col in columns])
+        ]
+        reasons = [[reason for reason, flags in reason_flags if flags[i]] for i in range(len(columns))]
+        
+        # Déterminer le type d'index approprié
+        recommended_types = np.select(
+            [(ratios == 1.0) & is_id, ratios == 1.0, ratios > 0.1],
+            ['PRIMARY KEY', 'UNIQUE', 'INDEX'],
+            default='INDEX (potentiellement composite)'
+        )
+        
+        index_analysis['candidate_indexes'] = [
+            {
+                'column': col,
+                'data_type': str(stats[col]['dtype']),
+                'cardinality': cardinality,
+                'total_rows': n_rows,
+                'cardinality_ratio': ratio if n_rows > 0 else 0,
+                'is_index_candidate': True,
+                'reasons': col_reasons,
+                'recommended_index_type': recommended_type
+            }
+            for col, cardinality, ratio, col_reasons, recommended_type in zip(
+                columns, cardinalities.tolist(), ratios.tolist(), reasons, recommended_types.tolist()
+            )
+            if col_reasons
+        ]
         
         # Identifier les index composites potentiels
         # Par exemple, pour les requêtes de date et statut ensemble
-        date_cols = [col for col in df.columns if 'date' in col.lower()]
-        status_cols = [col for col in df.columns if 'status' in col.lower()]
+        date_cols = [col for col in columns if 'date' in cols_lower[col]]
+        status_cols = [col for col in columns if 'status' in cols_lower[col]]
         
         if date_cols and status_cols:
             for date_col in date_cols:
@@ -107,12 +186,16 @@ class IndexAndConstraintAnalyzer:
         
         return index_analysis
     
-    def analyze_primary_keys(self, df: pd.DataFrame, table_name: str) -> Dict[str, Any]:
+    def analyze_primary_keys(self, df: pd.DataFrame, table_name: str,
+                             stats: Dict[str, Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Analyse les candidats potentiels pour les clés primaires
         """
         logger.info(f"Analyse des clés primaires pour la table: {table_name}")
         
+        if stats is None:
+            stats = self._column_stats(df)
+        
         pk_analysis = {
             'table_name': table_name,
             'potential_primary_keys': [],
@@ -122,20 +205,33 @@ class IndexAndConstraintAnalyzer:
         
         # Chercher des colonnes qui pourraient être des clés primaires
         for col in df.columns:
-            if df[col].is_unique and df[col].notna().all():
+            if stats[col]['is_unique'] and stats[col]['null_count'] == 0:
                 pk_analysis['single_column_pks'].append({
                     'column': col,
-                    'type': str(df[col].dtype),
+                    'type': str(stats[col]['dtype']),
                     'is_suitable_pk': True
                 })
         
         # Chercher des combinaisons de colonnes qui pourraient former des clés primaires
         # Essayons les paires de colonnes courantes
         id_cols = [col for col in df.columns if 'id' in col.lower()]
+        # Une paire contenant une colonne déjà unique est forcément unique : pas de scan pour elle
+        unique_cols = {col for col in id_cols if stats[col]['is_unique']}
+        # Codes entiers de chaque colonne, calculés une fois et réutilisés par toutes ses paires
+        factor_codes = {}
+        
+        # Pré-filtre sur un échantillon de lignes : un doublon dans l'échantillon est un doublon
+        # de la table, seules les paires sans doublon dans l'échantillon sont testées en entier
+        sample = None
+        sample_codes = {}
+        if len(df) > self._PK_SAMPLE_SIZE and len(id_cols) > 1:
+            sample = df[id_cols].sample(self._PK_SAMPLE_SIZE, random_state=0)
         
         for i, col1 in enumerate(id_cols):
             for col2 in id_cols[i+1:]:
-                if df[[col1, col2]].duplicated().sum() == 0:
+                if (col1 in unique_cols or col2 in unique_cols
+                        or ((sample is None or self._pair_unique(sample, col1, col2, sample_codes))
+                            and self._pair_unique(df, col1, col2, factor_codes))):
                     pk_analysis['composite_pks'].append({
                         'columns': [col1, col2],
                         'is_suitable_pk': True
@@ -143,9 +239,9 @@ class IndexAndConstraintAnalyzer:
         
         # Pour les tables de faits, on pourrait avoir des clés composites
         # incluant des clés étrangères et des dates
-        if 'order' in table_name.lower() or 'item' in table_name.lower() or 'payment' in table_name.lower():
+        if self._FACT_TABLE_RE.search(table_name.lower()):
             # Ces tables pourraient avoir des clés composites
-            potential_fk_cols = [col for col in df.columns if any(fk in col.lower() for fk in ['id', 'key'])]
+            potential_fk_cols = [col for col in df.columns if self._FK_RE.search(col.lower())]
             date_cols = [col for col in df.columns if 'date' in col.lower()]
             
             if potential_fk_cols and date_cols:
@@ -159,9 +255,81 @@ class IndexAndConstraintAnalyzer:
         
         return pk_analysis
     
-    def analyze_foreign_keys(self, tables: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    def _column_buckets(self, table_columns: Dict[str, List[str]],
+                        column_stats: Dict[str, Dict[str, Dict[str, Any]]] = None) -> Dict[Any, List[Tuple[int, int, str, str]]]:
+        """
+        Regroupe les colonnes de toutes les tables par nom normalisé (minuscules, sans '_'),
+        et par type lorsque les statistiques de colonnes sont fournies
+        """
+        buckets = defaultdict(list)
+        for table_pos, (table_name, columns) in enumerate(table_columns.items()):
+            for col_pos, col in enumerate(columns):
+                key = col.lower().replace('_', '')
+                if column_stats is not None:
+                    key = (key, str(column_stats[table_name][col]['dtype']))
+                buckets[key].append((table_pos, col_pos, table_name, col))
+        return buckets
+    
+    def _checked_relations(self) -> List[Dict[str, str]]:
+        """
+        Relations spécifiques à vérifier : une colonne rapportée à elle-même (même table, même
+        colonne) n'a jamais de référence manquante et est ignorée
+        """
+        return [
+            rel for rel in self._SPECIFIC_RELATIONS
+            if (rel['child_table'], rel['child_column']) != (rel['parent_table'], rel['parent_column'])
+        ]
+    
+    def _relation_columns(self, table_name: str) -> set:
+        """
+        Colonnes de la table impliquées dans une relation spécifique à vérifier
+        """
+        return (
+            {rel['child_column'] for rel in self._checked_relations() if rel['child_table'] == table_name}
+            | {rel['parent_column'] for rel in self._checked_relations() if rel['parent_table'] == table_name}
+        )
+    
+    def _foreign_key_columns(self, table_columns: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """
+        Colonnes de chaque table dont les valeurs distinctes sont nécessaires à l'analyse
+        des clés étrangères (déterminées à partir des seuls noms de colonnes)
+        """
+        fk_columns = defaultdict(set)
+        
+        for entries in self._column_buckets(table_columns).values():
+            for _, _, table1_name, col1 in entries:
+                for _, _, table2_name, col2 in entries:
+                    if table1_name != table2_name and col1 != col2:
+                        fk_columns[table1_name].add(col1)
+        
+        for rel in self._checked_relations():
+            fk_columns[rel['parent_table']].add(rel['parent_column'])
+            fk_columns[rel['child_table']].add(rel['child_column'])
+        
+        return {table_name: sorted(fk_columns[table_name]) for table_name in table_columns}
+    
+    def _pair_unique(self, df: pd.DataFrame, col1: str, col2: str,
+                     factor_codes: Dict[str, Tuple[np.ndarray, int]]) -> bool:
         """
-        Analyse les relations entre tables pour identifier les clés étrangères
+        Vérifie l'unicité d'une paire de colonnes sur leurs codes entiers (factorize) combinés
+        en une seule clé int64, plutôt qu'en hachant des paires d'objets
+        """
+        for col in (col1, col2):
+            if col not in factor_codes:
+                codes, uniques = pd.factorize(df[col])
+                factor_codes[col] = (codes, len(uniques))
+        
+        codes1, _ = factor_codes[col1]
+        codes2, n_uniques2 = factor_codes[col2]
+        # Les valeurs manquantes (code -1) forment une valeur à part, comme dans duplicated()
+        combined = (codes1.astype(np.int64) + 1) * (n_uniques2 + 1) + (codes2 + 1)
+        return len(np.unique(combined)) == len(df)
+    
+    def analyze_foreign_keys(self, column_stats: Dict[str, Dict[str, Dict[str, Any]]],
+                             column_values: Dict[Tuple[str, str], pa.Array]) -> Dict[str, Any]:
+        """
+        Analyse les relations entre tables pour identifier les clés étrangères, à partir des
+        statistiques de colonnes et des valeurs distinctes non nulles de chaque colonne candidate
         """
         logger.info("Analyse des relations de clés étrangères entre tables")
         
@@ -170,91 +338,86 @@ class IndexAndConstraintAnalyzer:
             'referential_integrity_issues': []
         }
         
-        table_names = list(tables.keys())
+        def is_text(values):
+            return pa.types.is_string(values.type) or pa.types.is_large_string(values.type)
+        
+        def missing_references(child_table, child_col, parent_table, parent_col):
+            child_values = column_values[(child_table, child_col)]
+            parent_values = column_values[(parent_table, parent_col)]
+            # Texte et valeurs non textuelles ne se correspondent jamais ; pyarrow convertirait
+            # sinon les valeurs parentes vers le type enfant avant la comparaison
+            if is_text(child_values) != is_text(parent_values):
+                return child_values
+            # Recherche par hachage en C++, dans l'ordre d'apparition des valeurs enfant
+            return child_values.filter(pc.invert(pc.is_in(child_values, value_set=parent_values)))
+        
+        # Regrouper les colonnes par nom normalisé et par type : seules les colonnes d'un même
+        # groupe (donc de types compatibles) sont comparées, au lieu de toutes les paires de
+        # colonnes de toutes les paires de tables
+        buckets = self._column_buckets({table_name: list(stats) for table_name, stats in column_stats.items()},
+                                       column_stats)
+        
+        # Paires (enfant, parent) de tables différentes, triées dans l'ordre de parcours
+        # table enfant / table parent / colonne enfant / colonne parent ; les groupes suivent
+        # l'ordre des tables, l'enfant d'une paire est donc toujours la table la plus ancienne
+        column_pairs = [
+            (child, parent)
+            for entries in buckets.values() if len(entries) > 1
+            for child, parent in combinations(entries, 2)
+            # Tables différentes, noms de colonnes différents ; les colonnes décimales
+            # (mesures, montants) ne sont pas des clés et ne sont pas comparées
+            if child[0] != parent[0] and child[3] != parent[3]
+            and column_stats[child[2]][child[3]]['dtype'].kind != 'f'
+        ]
+        column_pairs.sort(key=lambda pair: (pair[0][0], pair[1][0], pair[0][1], pair[1][1]))
         
         # Analyser les relations possibles entre les tables
-        for i, table1_name in enumerate(table_names):
-            table1 = tables[table1_name]
+        for (_, _, table1_name, col1), (_, _, table2_name, col2) in column_pairs:
+            # Vérifier si toutes les valeurs de table1[col1] existent dans table2[col2]
+            missing_values = missing_references(table1_name, col1, table2_name, col2)
             
-            for table2_name in table_names[i+1:]:
-                table2 = tables[table2_name]
-                
-                # Chercher des colonnes avec des noms similaires qui pourraient indiquer une relation
-                for col1 in table1.columns:
-                    for col2 in table2.columns:
-                        # Vérifier si les colonnes ont des noms similaires et des types compatibles
-                        if (col1.lower().replace('_', '') == col2.lower().replace('_', '') and 
-                            col1 != col2 and
-                            pd.api.types.is_dtype_equal(table1[col1].dtype, table2[col2].dtype)):
-                            
-                            # Vérifier si toutes les valeurs de table1[col1] existent dans table2[col2]
-                            missing_values = set(table1[col1].dropna().unique()) - set(table2[col2].dropna().unique())
-                            
-                            fk_candidate = {
-                                'parent_table': table2_name,
-                                'child_table': table1_name,
-                                'parent_column': col2,
-                                'child_column': col1,
-                                'missing_references': len(missing_values),
-                                'missing_sample': list(missing_values)[:5] if missing_values else []
-                            }
-                            
-                            fk_analysis['foreign_key_candidates'].append(fk_candidate)
-        
-        # Analyser les relations spécifiques basées sur le schéma connu
-        # (basé sur les noms de colonnes et le contexte métier)
-        specific_relations = [
-            # Relations clientes-adresses
-            {
-                'parent_table': 'zip_code_reference',
-                'child_table': 'customers_with_geolocation',
-                'parent_column': 'zip_code_prefix',
-                'child_column': 'customer_zip_code_prefix'
-            },
-            {
-                'parent_table': 'zip_code_reference',
-                'child_table': 'sellers_with_geolocation',
-                'parent_column': 'zip_code_prefix',
-                'child_column': 'seller_zip_code_prefix'
-            },
-            # Relation commandes-paiements
-            {
-                'parent_table': 'order_financial_reconciliation',
-                'child_table': 'order_financial_reconciliation',  # Cette table contient déjà les relations
-                'parent_column': 'order_id',
-                'child_column': 'order_id'
+            fk_candidate = {
+                'parent_table': table2_name,
+                'child_table': table1_name,
+                'parent_column': col2,
+                'child_column': col1,
+                'missing_references': len(missing_values),
+                'missing_sample': missing_values[:5].to_pylist()
             }
-        ]
+            
+            fk_analysis['foreign_key_candidates'].append(fk_candidate)
         
-        for rel in specific_relations:
+        # Analyser les relations spécifiques basées sur le schéma connu
+        for rel in self._checked_relations():
             parent_table = rel['parent_table']
             child_table = rel['child_table']
             parent_col = rel['parent_column']
             child_col = rel['child_column']
             
-            if parent_table in tables and child_table in tables:
-                parent_df = tables[parent_table]
-                child_df = tables[child_table]
-                
-                if parent_col in parent_df.columns and child_col in child_df.columns:
+            if parent_table in column_stats and child_table in column_stats:
+                if parent_col in column_stats[parent_table] and child_col in column_stats[child_table]:
                     # Vérifier l'intégrité référentielle
-                    missing_refs = set(child_df[child_col].dropna().unique()) - set(parent_df[parent_col].dropna().unique())
+                    missing_refs = missing_references(child_table, child_col, parent_table, parent_col)
                     
-                    if missing_refs:
+                    if len(missing_refs) > 0:
                         fk_analysis['referential_integrity_issues'].append({
                             'relation': f"{child_table}.{child_col} -> {parent_table}.{parent_col}",
                             'missing_references_count': len(missing_refs),
-                            'sample_missing_values': list(missing_refs)[:10]
+                            'sample_missing_values': missing_refs[:10].to_pylist()
                         })
         
         return fk_analysis
     
-    def define_constraints(self, df: pd.DataFrame, table_name: str) -> Dict[str, Any]:
+    def define_constraints(self, df: pd.DataFrame, table_name: str,
+                           stats: Dict[str, Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Définit les contraintes d'intégrité pour une table
         """
         logger.info(f"Définition des contraintes pour la table: {table_name}")
         
+        if stats is None:
+            stats = self._column_stats(df)
+        
         constraints = {
             'table_name': table_name,
             'primary_key_constraints': [],
@@ -266,7 +429,7 @@ class IndexAndConstraintAnalyzer:
         
         # Contraintes NOT NULL pour les colonnes ID
         for col in df.columns:
-            if 'id' in col.lower() and df[col].isna().sum() == 0:
+            if 'id' in col.lower() and stats[col]['null_count'] == 0:
                 constraints['not_null_constraints'].append({
                     'column': col,
                     'constraint_type': 'NOT NULL',
@@ -275,21 +438,22 @@ class IndexAndConstraintAnalyzer:
         
         # Contraintes CHECK pour les colonnes numériques
         numeric_cols = df.select_dtypes(include=[np.number]).columns
+        # Présence de valeurs négatives testée en une passe sur l'ensemble des colonnes numériques
+        has_negative = (df[numeric_cols] < 0).any()
         for col in numeric_cols:
-            if 'price' in col.lower() or 'amount' in col.lower() or 'freight' in col.lower():
+            col_lower = col.lower()
+            if self._MONEY_RE.search(col_lower):
                 # Les prix/montants ne devraient pas être négatifs
-                negative_count = (df[col] < 0).sum()
-                if negative_count == 0:
+                if not has_negative[col]:
                     constraints['check_constraints'].append({
                         'column': col,
                         'constraint_type': 'CHECK',
                         'condition': f'{col} >= 0',
                         'reason': 'Les montants ne devraient pas être négatifs'
                     })
-            elif 'quantity' in col.lower() or 'count' in col.lower():
+            elif self._QTY_RE.search(col_lower):
                 # Les quantités/comptes ne devraient pas être négatifs
-                negative_count = (df[col] < 0).sum()
-                if negative_count == 0:
+                if not has_negative[col]:
                     constraints['check_constraints'].append({
                         'column': col,
                         'constraint_type': 'CHECK',
@@ -299,7 +463,7 @@ class IndexAndConstraintAnalyzer:
         
         # Contraintes UNIQUE pour les colonnes ID uniques
         for col in df.columns:
-            if df[col].is_unique and 'id' in col.lower():
+            if stats[col]['is_unique'] and 'id' in col.lower():
                 constraints['unique_constraints'].append({
                     'column': col,
                     'constraint_type': 'UNIQUE',
@@ -308,22 +472,71 @@ class IndexAndConstraintAnalyzer:
         
         return constraints
     
+    def analyze_table(self, table_name: str, data_file: Path, fk_columns: List[str]) -> Tuple[Any, ...]:
+        """
+        Charge et analyse une table (index, clés primaires, contraintes) ; exécutée dans un
+        processus séparé, seuls les résultats et les valeurs distinctes des colonnes candidates
+        aux clés étrangères sont renvoyés (None si la table ne peut pas être chargée)
+        """
+        try:
+            df = self._read_table(data_file)
+            logger.info(f"Table chargée: {table_name} ({len(df)} lignes, {len(df.columns)} colonnes)")
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement de {data_file}: {str(e)}")
+            return None
+        
+        logger.info(f"Analyse de la table: {table_name}")
+        
+        stats = self._column_stats(df)
+        
+        # Analyse des besoins en index
+        index_result = self.analyze_index_needs(df, table_name, stats)
+        
+        # Analyse des clés primaires
+        pk_result = self.analyze_primary_keys(df, table_name, stats)
+        
+        # Définition des contraintes
+        constraint_result = self.define_constraints(df, table_name, stats)
+        
+        # Les colonnes décimales ne sont conservées que pour les relations spécifiques
+        # (ex. code postal lu en flottant à cause de valeurs manquantes)
+        relation_columns = self._relation_columns(table_name)
+        column_values = {
+            col: pa.array(pd.unique(df[col].dropna()))
+            for col in fk_columns
+            if col in df.columns and (col in relation_columns or stats[col]['dtype'].kind != 'f')
+        }
+        
+        # DDL de la table produit directement à partir de ses résultats
+        ddl = self.generate_table_ddl(table_name, stats, index_result, pk_result)
+        
+        return stats, index_result, pk_result, constraint_result, column_values, ddl
+    
     def analyze_indexes_and_constraints(self) -> Dict[str, Any]:
         """
         Analyse complète des besoins en index et contraintes
         """
         logger.info("Démarrage de l'analyse des index et contraintes")
         
-        # Charger toutes les tables
-        tables = self.load_tables()
+        # Première passe légère : fichiers et noms de colonnes uniquement, les tables
+        # sont ensuite chargées une à une par les processus d'analyse
+        table_files = self.list_tables()
+        table_columns = {}
+        for table_name, data_file in table_files.items():
+            try:
+                table_columns[table_name] = self._read_columns(data_file)
+            except Exception as e:
+                logger.error(f"Erreur lors du chargement de {data_file}: {str(e)}")
         
-        if not tables:
+        if not table_columns:
             logger.warning("Aucune table de données trouvée à analyser")
             return {"error": "Aucune table de données trouvée"}
         
+        fk_columns = self._foreign_key_columns(table_columns)
+        
         analysis_results = {
             "analysis_timestamp": pd.Timestamp.now().isoformat(),
-            "total_tables_analyzed": len(tables),
+            "total_tables_analyzed": 0,
             "index_analysis": {},
             "primary_key_analysis": {},
             "foreign_key_analysis": {},
@@ -331,129 +544,173 @@ class IndexAndConstraintAnalyzer:
             "sql_ddl_statements": []
         }
         
-        # Analyser chaque table
-        for table_name, df in tables.items():
-            logger.info(f"Analyse de la table: {table_name}")
+        # Statistiques de colonnes calculées une fois par table et partagées par toutes les analyses
+        column_stats = {}
+        # Valeurs distinctes non nulles par (table, colonne) candidate aux clés étrangères :
+        # seules ces valeurs sont conservées, pas les tables complètes
+        column_values = {}
+        # CREATE TABLE et CREATE INDEX de chaque table
+        table_ddl = {}
+        
+        # Analyser chaque table : les tables sont indépendantes, elles sont réparties
+        # sur plusieurs processus (résultats récupérés dans l'ordre des tables)
+        table_names = list(table_columns)
+        max_workers = min(len(table_names), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            table_results = executor.map(self.analyze_table, table_names,
+                                         [table_files[name] for name in table_names],
+                                         [fk_columns[name] for name in table_names])
             
-            # Analyse des besoins en index
-            index_result = self.analyze_index_needs(df, table_name)
-            analysis_results["index_analysis"][table_name] = index_result
-            
-            # Analyse des clés primaires
-            pk_result = self.analyze_primary_keys(df, table_name)
-            analysis_results["primary_key_analysis"][table_name] = pk_result
-            
-            # Définition des contraintes
-            constraint_result = self.define_constraints(df, table_name)
-            analysis_results["constraint_definitions"][table_name] = constraint_result
+            for table_name, table_result in zip(table_names, table_results):
+                if table_result is None:
+                    continue
+                stats, index_result, pk_result, constraint_result, values, ddl = table_result
+                column_stats[table_name] = stats
+                table_ddl[table_name] = ddl
+                column_values.update({(table_name, col): col_values for col, col_values in values.items()})
+                analysis_results["index_analysis"][table_name] = index_result
+                analysis_results["primary_key_analysis"][table_name] = pk_result
+                analysis_results["constraint_definitions"][table_name] = constraint_result
+        
+        analysis_results["total_tables_analyzed"] = len(column_stats)
         
         # Analyse des clés étrangères entre tables
-        fk_result = self.analyze_foreign_keys(tables)
+        fk_result = self.analyze_foreign_keys(column_stats, column_values)
         analysis_results["foreign_key_analysis"] = fk_result
         
         # Générer les énoncés DDL SQL
-        ddl_statements = self.generate_sql_ddl(tables, analysis_results)
+        ddl_statements = self.generate_sql_ddl(table_ddl, fk_result)
         analysis_results["sql_ddl_statements"] = ddl_statements
         
         logger.info("Analyse des index et contraintes terminée")
         
         return analysis_results
     
-    def load_tables(self) -> Dict[str, pd.DataFrame]:
+    def list_tables(self) -> Dict[str, Path]:
         """
-        Charge toutes les tables de données traitées
+        Liste les fichiers des tables de données traitées, par nom de table
         """
         logger.info("Chargement des tables de données pour l'analyse d'index et contraintes")
         
-        tables = {}
+        table_files = {}
         
-        # Lister les fichiers CSV dans le répertoire de données traitées
-        csv_files = list(self.processed_data_path.glob("*.csv"))
+        # Lister les fichiers CSV et Parquet dans le répertoire de données traitées
+        data_files = [*self.processed_data_path.glob("*.csv"), *self.processed_data_path.glob("*.parquet")]
         
-        # Ajouter les sous-répertoires
+        # Ajouter les sous-répertoires (hors caches de lecture _cache)
         for subdir in self.processed_data_path.iterdir():
-            if subdir.is_dir():
-                csv_files.extend(subdir.glob("*.csv"))
+            if subdir.is_dir() and subdir.name != '_cache':
+                data_files.extend(subdir.glob("*.csv"))
+                data_files.extend(subdir.glob("*.parquet"))
         
-        for csv_file in csv_files:
-            try:
-                # Extraire le nom de la table à partir du nom de fichier
-                table_name = csv_file.stem.replace('.csv', '')
-                
-                # Charger la table
-                df = pd.read_csv(csv_file, low_memory=False)
-                tables[table_name] = df
-                
-                logger.info(f"Table chargée: {table_name} ({len(df)} lignes, {len(df.columns)} colonnes)")
-            except Exception as e:
-                logger.error(f"Erreur lors du chargement de {csv_file}: {str(e)}")
+        for data_file in data_files:
+            # Extraire le nom de la table à partir du nom de fichier
+            table_files[data_file.stem] = data_file
         
-        return tables
+        return table_files
+    
+    def _read_columns(self, data_file: Path) -> List[str]:
+        """
+        Lit uniquement les noms de colonnes d'une table (en-tête CSV ou schéma Parquet)
+        """
+        if data_file.suffix == '.parquet':
+            return pq.read_schema(data_file).names
+        return list(pd.read_csv(data_file, nrows=0).columns)
     
-    def generate_sql_ddl(self, tables: Dict[str, pd.DataFrame], analysis_results: Dict[str, Any]) -> List[str]:
+    def _read_table(self, data_file: Path) -> pd.DataFrame:
+        """
+        Charge une table traitée ; les CSV passent par le parseur pyarrow et un cache Parquet
+        (_cache), régénéré si le CSV est plus récent
         """
-        Génère les énoncés SQL DDL pour créer les tables avec index et contraintes
+        if data_file.suffix == '.parquet':
+            df = pd.read_parquet(data_file)
+            # Catégories et chaînes Arrow ramenées au type texte produit par read_csv
+            text_cols = df.select_dtypes(include=['category', 'string']).columns
+            df[text_cols] = df[text_cols].astype(object).infer_objects()
+            return df
+        
+        if not self.fast_io:
+            return pd.read_csv(data_file, low_memory=False)
+        
+        cache_path = data_file.parent / "_cache" / data_file.with_suffix(".parquet").name
+        if cache_path.exists() and cache_path.stat().st_mtime >= data_file.stat().st_mtime:
+            return pd.read_parquet(cache_path)
+        
+        # pyarrow reconnaît les horodatages que read_csv laisse en texte : ces colonnes,
+        # repérées sur le premier bloc, sont imposées comme chaînes au parseur pour garder
+        # les mêmes types et le texte d'origine
+        schema = pa_csv.open_csv(data_file).schema
+        timestamp_cols = {field.name: str for field in schema if pa.types.is_timestamp(field.type)}
+        df = read_csv_arrow(data_file, timestamp_cols)
+        
+        cache_path.parent.mkdir(exist_ok=True)
+        df.to_parquet(cache_path, engine='pyarrow', compression='zstd', index=False)
+        return df
+    
+    def generate_table_ddl(self, table_name: str, stats: Dict[str, Dict[str, Any]],
+                           index_analysis: Dict[str, Any], pk_analysis: Dict[str, Any]) -> Tuple[str, List[str]]:
         """
-        ddl_statements = []
+        Génère le CREATE TABLE et les CREATE INDEX d'une table, dans la même passe que son analyse
+        """
+        # Clés primaires de la table, repérées une fois plutôt qu'à chaque colonne
+        pk_columns = {pk.get('column') for pk in pk_analysis.get('single_column_pks', [])}
+        primary_keys = [col for col in stats if col in pk_columns]
         
-        # Générer les CREATE TABLE pour chaque table
-        for table_name, df in tables.items():
-            create_statement = f"CREATE TABLE {table_name} (\n"
-            
-            columns_def = []
-            primary_keys = []
+        columns_def = []
+        
+        for col in stats:
+            # Déterminer le type SQL approprié
+            sql_type = self.map_pandas_to_sql_type(stats[col]['dtype'])
             
-            for col in df.columns:
-                # Déterminer le type SQL approprié
-                sql_type = self.map_pandas_to_sql_type(df[col].dtype)
-                
-                col_def = f"    {col} {sql_type}"
-                
-                # Ajouter les contraintes NOT NULL si pertinent
-                if df[col].isna().sum() == 0 and 'id' in col.lower():
-                    col_def += " NOT NULL"
-                
-                # Si c'est une clé primaire
-                pk_analysis = analysis_results["primary_key_analysis"][table_name]
-                if any(col == pk.get('column') for pk in pk_analysis.get('single_column_pks', [])):
-                    col_def += " PRIMARY KEY"
-                    primary_keys.append(col)
-                
-                columns_def.append(col_def)
+            col_def = f"    {col} {sql_type}"
             
-            # Si on a des clés primaires multiples, on les définit séparément
-            if len(primary_keys) > 1:
-                # Retirer les PRIMARY KEY des définitions de colonnes
-                for i, col_def in enumerate(columns_def):
-                    if " PRIMARY KEY" in col_def:
-                        columns_def[i] = col_def.replace(" PRIMARY KEY", "")
-                
-                # Ajouter la contrainte de clé primaire composite
-                pk_constraint = f"    CONSTRAINT PK_{table_name} PRIMARY KEY ({', '.join(primary_keys)})"
-                columns_def.append(pk_constraint)
+            # Ajouter les contraintes NOT NULL si pertinent
+            if stats[col]['null_count'] == 0 and 'id' in col.lower():
+                col_def += " NOT NULL"
             
-            create_statement += ",\n".join(columns_def)
-            create_statement += "\n);"
+            # Si c'est l'unique clé primaire, elle est déclarée sur la colonne
+            if len(primary_keys) == 1 and col in pk_columns:
+                col_def += " PRIMARY KEY"
             
-            ddl_statements.append(create_statement)
+            columns_def.append(col_def)
+        
+        # Si on a des clés primaires multiples, on les définit séparément
+        if len(primary_keys) > 1:
+            # Ajouter la contrainte de clé primaire composite
+            pk_constraint = f"    CONSTRAINT PK_{table_name} PRIMARY KEY ({', '.join(primary_keys)})"
+            columns_def.append(pk_constraint)
+        
+        # Énoncé assemblé en une seule concaténation
+        create_statement = f"CREATE TABLE {table_name} (\n" + ",\n".join(columns_def) + "\n);"
         
         # Générer les énoncés CREATE INDEX
-        for table_name, index_analysis in analysis_results["index_analysis"].items():
-            for candidate in index_analysis["candidate_indexes"]:
-                if 'column' in candidate:  # Index simple
-                    col = candidate['column']
-                    idx_name = f"IDX_{table_name}_{col}"
-                    if candidate['recommended_index_type'] in ['UNIQUE', 'PRIMARY KEY']:
-                        ddl_statements.append(f"CREATE UNIQUE INDEX {idx_name} ON {table_name} ({col});")
-                    else:
-                        ddl_statements.append(f"CREATE INDEX {idx_name} ON {table_name} ({col});")
-                elif 'columns' in candidate:  # Index composite
-                    cols = candidate['columns']
-                    idx_name = f"IDX_{table_name}_{'_'.join(cols)}"
-                    ddl_statements.append(f"CREATE INDEX {idx_name} ON {table_name} ({', '.join(cols)});")
+        index_statements = []
+        for candidate in index_analysis["candidate_indexes"]:
+            if 'column' in candidate:  # Index simple
+                col = candidate['column']
+                idx_name = f"IDX_{table_name}_{col}"
+                if candidate['recommended_index_type'] in ['UNIQUE', 'PRIMARY KEY']:
+                    index_statements.append(f"CREATE UNIQUE INDEX {idx_name} ON {table_name} ({col});")
+                else:
+                    index_statements.append(f"CREATE INDEX {idx_name} ON {table_name} ({col});")
+            elif 'columns' in candidate:  # Index composite
+                cols = candidate['columns']
+                idx_name = f"IDX_{table_name}_{'_'.join(cols)}"
+                index_statements.append(f"CREATE INDEX {idx_name} ON {table_name} ({', '.join(cols)});")
+        
+        return create_statement, index_statements
+    
+    def generate_sql_ddl(self, table_ddl: Dict[str, Tuple[str, List[str]]], fk_analysis: Dict[str, Any]) -> List[str]:
+        """
+        Génère les énoncés SQL DDL pour créer les tables avec index et contraintes : CREATE TABLE
+        puis CREATE INDEX (produits par table pendant l'analyse), puis les clés étrangères
+        """
+        ddl_statements = [create_statement for create_statement, _ in table_ddl.values()]
+        for _, index_statements in table_ddl.values():
+            ddl_statements.extend(index_statements)
         
         # Générer les énoncés ALTER TABLE pour les clés étrangères
-        for fk_relation in analysis_results["foreign_key_analysis"]["foreign_key_candidates"]:
+        for fk_relation in fk_analysis["foreign_key_candidates"]:
             parent_table = fk_relation['parent_table']
             child_table = fk_relation['child_table']
             parent_col = fk_relation['parent_column']
@@ -469,20 +726,10 @@ class IndexAndConstraintAnalyzer:
     
     def map_pandas_to_sql_type(self, pandas_dtype) -> str:
         """
-        Convertit un type pandas en type SQL équivalent
-        """
-        if pd.api.types.is_integer_dtype(pandas_dtype):
-            # Déterminer la taille appropriée basée sur les valeurs
-            return "INTEGER"
-        elif pd.api.types.is_float_dtype(pandas_dtype):
-            return "DECIMAL(15,2)"  # Pour les montants monétaires
-        elif pd.api.types.is_bool_dtype(pandas_dtype):
-            return "BOOLEAN"
-        elif pd.api.types.is_datetime64_any_dtype(pandas_dtype):
-            return "TIMESTAMP"
-        else:
-            # Pour les objets/string, déterminer la longueur maximale
-            return "VARCHAR(255)"  # Taille par défaut
+        Convertit un type pandas en type SQL équivalent (une recherche sur dtype.kind, qui couvre
+        aussi les types nullables, Arrow et datetime avec fuseau)
+        """
+        return self._KIND_TO_SQL.get(pd.api.types.pandas_dtype(pandas_dtype).kind, "VARCHAR(255)")
     
     def generate_index_constraint_report(self, analysis_results: Dict[str, Any], output_path: str = None):
         """
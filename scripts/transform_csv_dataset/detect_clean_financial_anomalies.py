@@ -8,6 +8,8 @@ import numpy as np
 from pathlib import Path
 import os
 import yaml
+from raw_data_cache import load_cached
+from financial_core import build_financial_join
 
 def load_configuration():
     """Charge la configuration depuis le fichier YAML"""
@@ -40,9 +42,26 @@ def detect_and_clean_anomalies():
     order_items_file = os.path.join(RAW_DATA_PATH, 'olist_order_items_dataset.csv')
     order_payments_file = os.path.join(RAW_DATA_PATH, 'olist_order_payments_dataset.csv')
     
-    orders = pd.read_csv(orders_file)
-    order_items = pd.read_csv(order_items_file)
-    order_payments = pd.read_csv(order_payments_file)
+    # Lecture multi-threadée via le moteur pyarrow, mise en cache Feather pour les relances ;
+    # order_id en chaînes Arrow (hachage natif pour les jointures/isin/groupby) et
+    # order_status, peu cardinal, en catégorie
+    # orders ne sert qu'au statut de la réconciliation : seules 2 colonnes sont lues.
+    # Horodatages gardés en texte, tels que dans les CSV bruts (le cache est partagé avec
+    # advanced_financial_cleaning, qui les exporte)
+    orders = load_cached(orders_file, dtype={
+        'order_id': 'string[pyarrow]', 'order_status': 'category',
+        'order_purchase_timestamp': str, 'order_approved_at': str, 'order_delivered_carrier_date': str,
+        'order_delivered_customer_date': str, 'order_estimated_delivery_date': str
+    }, usecols=['order_id', 'order_status'])
+    # Montants en float32 et compteurs en int16 : moitié moins d'octets à parcourir dans les
+    # groupby/jointures, précision largement suffisante pour des montants à 2 décimales
+    order_items = load_cached(order_items_file, dtype={
+        'order_id': 'string[pyarrow]', 'order_item_id': 'int16', 'price': 'float32', 'freight_value': 'float32',
+        'shipping_limit_date': str
+    })
+    order_payments = load_cached(order_payments_file, dtype={
+        'order_id': 'string[pyarrow]', 'payment_sequential': 'int16', 'payment_installments': 'int16', 'payment_value': 'float32'
+    })
     
     print(f"   • Orders: {len(orders):,}")
     print(f"   • Order Items: {len(order_items):,} ({order_items['order_id'].nunique():,} commandes)")
@@ -54,44 +73,14 @@ def detect_and_clean_anomalies():
     print("\n   Detection des anomalies...")
 
     # --- Anomalie 1 : Montants non réconciliés ---
-    item_totals = order_items.groupby('order_id').agg(
-        item_count=('order_item_id', 'count'),
-        seller_count=('seller_id', 'nunique'),
-        total_price=('price', 'sum'),
-        total_freight=('freight_value', 'sum'),
-        order_total=('price', lambda x: (x + order_items.loc[x.index, 'freight_value']).sum())
-    ).reset_index()
-
-    payment_totals = order_payments.groupby('order_id').agg(
-        payment_count=('payment_sequential', 'count'),
-        payment_type_count=('payment_type', 'nunique'),
-        payment_total=('payment_value', 'sum'),
-        payment_types=('payment_type', lambda x: ', '.join(sorted(x.unique()))),
-        max_installments=('payment_installments', 'max')
-    ).reset_index()
-
-    # Jointure avec orders pour statut
-    reconciliation = orders[['order_id', 'order_status']].merge(
-        item_totals, on='order_id', how='left'
-    ).merge(
-        payment_totals, on='order_id', how='left'
-    )
-
-    # Calcul des écarts
-    reconciliation['item_total'] = reconciliation['order_total'].fillna(0)
-    reconciliation['payment_total'] = reconciliation['payment_total'].fillna(0)
-    reconciliation['amount_difference'] = (reconciliation['item_total'] - reconciliation['payment_total']).abs()
-
-    # Flags d'anomalies
-    reconciliation['anomaly_no_items'] = reconciliation['item_count'].isna()
-    reconciliation['anomaly_no_payment'] = reconciliation['payment_count'].isna()
-    reconciliation['anomaly_amount_mismatch'] = reconciliation['amount_difference'] > 0.01
-    reconciliation['anomaly_many_payments'] = reconciliation['payment_count'] > 10
-    reconciliation['anomaly_many_items'] = reconciliation['item_count'] > 15
-    reconciliation['anomaly_delivered_no_payment'] = (
-        (reconciliation['order_status'] == 'delivered') &
-        reconciliation['anomaly_no_payment']
-    )
+    # Jointure déjà calculée par advanced_financial_cleaning si elle est à jour des CSV bruts,
+    # sinon reconstruite à partir des tables chargées
+    financials_file = Path(PROCESSED_DATA_PATH) / "advanced_cleaning" / "orders_with_financials.parquet"
+    raw_mtime = max(os.path.getmtime(f) for f in (orders_file, order_items_file, order_payments_file))
+    if financials_file.exists() and financials_file.stat().st_mtime >= raw_mtime:
+        reconciliation = pd.read_parquet(financials_file)
+    else:
+        reconciliation = build_financial_join(orders, order_items, order_payments)
 
     # --- Anomalie 2 : Paiements suspects ---
     payment_anomalies = order_payments.copy()
@@ -124,7 +113,7 @@ def detect_and_clean_anomalies():
     critical = reconciliation[reconciliation['anomaly_delivered_no_payment']]
     if not critical.empty:
         print(f"\n   COMMANDE LIVREE SANS PAIEMENT:")
-        print(critical[['order_id', 'order_status', 'item_total', 'payment_total']].to_string(index=False))
+        print(critical[['order_id', 'order_status', 'item_total', 'payment_total']].to_string(index=False, float_format='{:.2f}'.format))
         print("   -> Action requise: Verifier si livraison gratuite/voucher ou erreur systeme")
 
     # Plus grands écarts
@@ -133,7 +122,7 @@ def detect_and_clean_anomalies():
     ).head(5)
     if not big_diffs.empty:
         print(f"\n   5 plus grands ecarts montants:")
-        print(big_diffs[['order_id', 'item_total', 'payment_total', 'amount_difference']].to_string(index=False))
+        print(big_diffs[['order_id', 'item_total', 'payment_total', 'amount_difference']].to_string(index=False, float_format='{:.2f}'.format))
 
     # Paiements suspects
     suspicious_payments = payment_anomalies[
@@ -145,7 +134,7 @@ def detect_and_clean_anomalies():
         print(f"\n   Paiements suspects:")
         print(suspicious_payments[
             ['order_id', 'payment_type', 'payment_value', 'payment_installments']
-        ].to_string(index=False))
+        ].to_string(index=False, float_format='{:.2f}'.format))
 
     # ============================================================================
     # 4. NETTOYAGE & CORRECTION
@@ -190,15 +179,16 @@ def detect_and_clean_anomalies():
     # Export
     order_items_output = os.path.join(output_dir, "order_items_clean.csv")
     order_payments_output = os.path.join(output_dir, "order_payments_clean.csv")
-    reconciliation_output = os.path.join(output_dir, "order_financial_reconciliation.csv")
+    reconciliation_output = os.path.join(output_dir, "order_financial_reconciliation.parquet")
     
     order_items_final.to_csv(order_items_output, index=False)
     order_payments_final.to_csv(order_payments_output, index=False)
-    reconciliation.to_csv(reconciliation_output, index=False)
+    # Table détaillée (une ligne par commande, flags booléens) : Parquet compressé plutôt que CSV
+    reconciliation.to_parquet(reconciliation_output, engine='pyarrow', compression='zstd', index=False)
 
     print(f"   -> order_items_clean.csv ({len(order_items_final):,} lignes)")
     print(f"   -> order_payments_clean.csv ({len(order_payments_final):,} lignes)")
-    print(f"   -> order_financial_reconciliation.csv ({len(reconciliation):,} lignes)")
+    print(f"   -> order_financial_reconciliation.parquet ({len(reconciliation):,} lignes)")
 
     # ============================================================================
     # 6. RAPPORT DE QUALITÉ
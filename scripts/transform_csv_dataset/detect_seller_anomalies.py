@@ -8,10 +8,15 @@ import numpy as np
 import os
 import yaml
 import re
+from concurrent.futures import ThreadPoolExecutor
+from zip_reference import load_zip_reference, join_zip_reference
 import warnings
 
 warnings.filterwarnings('ignore')
 
+# Aperçus détaillés (head, répartitions) uniquement sur demande : ETL_VERBOSE=1
+VERBOSE = os.environ.get('ETL_VERBOSE', '0') == '1'
+
 def load_configuration():
     """Charge la configuration depuis le fichier YAML"""
     with open('config/config.yaml', 'r') as f:
@@ -33,78 +38,61 @@ def detect_seller_anomalies():
     # Charger la configuration
     RAW_DATA_PATH, PROCESSED_DATA_PATH, REPORTS_PATH = load_configuration()
     
-    # Charger les données des vendeurs
-    print("Chargement des données des vendeurs...")
+    # Charger les données des vendeurs et la table de référence géographique :
+    # lectures indépendantes lancées en parallèle (le parsing pyarrow libère le GIL)
     sellers_file = os.path.join(RAW_DATA_PATH, 'olist_sellers_dataset.csv')
-    df_sellers = pd.read_csv(sellers_file)
-    
-    print(f"[OK] Données des vendeurs chargées: {df_sellers.shape[0]:,} lignes x {df_sellers.shape[1]} colonnes")
-    
-    # Charger la table de référence géographique
-    print("Chargement de la table de référence géographique...")
-    zip_ref_file = os.path.join(PROCESSED_DATA_PATH, 'zip_code_reference.csv')
-    df_zip_ref = pd.read_csv(zip_ref_file)
-    
-    print(f"[OK] Table de référence chargée: {df_zip_ref.shape[0]:,} lignes x {df_zip_ref.shape[1]} colonnes")
+    zip_ref_file = os.path.join(PROCESSED_DATA_PATH, 'zip_code_reference.parquet')
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        # Types explicites : identifiants en chaînes Arrow, préfixe en entier nullable Int32 (un préfixe
+        # manquant reste NA au lieu de faire échouer la lecture), état peu cardinal en catégorie
+        sellers_future = executor.submit(pd.read_csv, sellers_file, engine='pyarrow', dtype={
+            'seller_id': 'string[pyarrow]', 'seller_zip_code_prefix': 'Int32', 'seller_city': 'str', 'seller_state': 'category'
+        })
+        # Colonnes utilisées par la jointure, extraites de la table de référence partagée (lue une fois par processus)
+        zip_ref_future = executor.submit(load_zip_reference, zip_ref_file, columns=['zip_code_prefix', 'state', 'canonical_city_name'])
+        
+        print("Chargement des données des vendeurs...")
+        df_sellers = sellers_future.result()
+        print(f"[OK] Données des vendeurs chargées: {df_sellers.shape[0]:,} lignes x {df_sellers.shape[1]} colonnes")
+        
+        print("Chargement de la table de référence géographique...")
+        df_zip_ref = zip_ref_future.result()
+        print(f"[OK] Table de référence chargée: {df_zip_ref.shape[0]:,} lignes x {df_zip_ref.shape[1]} colonnes")
     
     # Afficher les structures pour comprendre les colonnes
     print(f"\nColonnes vendeurs: {list(df_sellers.columns)}")
     print(f"Colonnes référence: {list(df_zip_ref.columns)}")
     
-    # Renommer les colonnes si nécessaire pour correspondre à la structure attendue
-    df_sellers_renamed = df_sellers.rename(columns={
-        'seller_zip_code_prefix': 'seller_zip_code_prefix',
-        'seller_city': 'seller_city',
-        'seller_state': 'seller_state'
-    })
-    
-    # Créer une copie pour ajouter les indicateurs d'anomalie
-    df_sellers_anomalies = df_sellers_renamed.copy()
-    
     # Détecter différentes formes d'anomalies dans les noms de villes
-    # 1. Villes avec seulement des chiffres
-    df_sellers_anomalies['anomaly_numeric_city'] = df_sellers_anomalies['seller_city'].apply(
-        lambda x: 1 if pd.notna(x) and str(x).strip().isdigit() else 0
-    )
-    
-    # 2. Villes contenant des slashs
-    df_sellers_anomalies['anomaly_contains_slashes'] = df_sellers_anomalies['seller_city'].apply(
-        lambda x: 1 if pd.notna(x) and ('/' in str(x) or '\\' in str(x)) else 0
-    )
-    
-    # 3. Villes contenant des virgules
-    df_sellers_anomalies['anomaly_contains_commas'] = df_sellers_anomalies['seller_city'].apply(
-        lambda x: 1 if pd.notna(x) and ',' in str(x) else 0
-    )
-    
-    # 4. Villes contenant 'brasil' (insensible à la casse)
-    df_sellers_anomalies['anomaly_contains_brasil'] = df_sellers_anomalies['seller_city'].apply(
-        lambda x: 1 if pd.notna(x) and 'brasil' in str(x).lower() else 0
-    )
-    
-    # 5. Villes trop courtes (moins de 3 caractères)
-    df_sellers_anomalies['anomaly_too_short'] = df_sellers_anomalies['seller_city'].apply(
-        lambda x: 1 if pd.notna(x) and len(str(x).strip()) < 3 else 0
-    )
-    
-    # 6. Villes avec des espaces multiples ou des espaces inappropriés
-    df_sellers_anomalies['anomaly_extra_spaces'] = df_sellers_anomalies['seller_city'].apply(
-        lambda x: 1 if pd.notna(x) and ('  ' in str(x) or ' / ' in str(x)) else 0
-    )
-    
-    # Joindre avec la table de référence pour comparer avec les noms canoniques
-    df_sellers_anomalies = df_sellers_anomalies.merge(
-        df_zip_ref[['zip_code_prefix', 'state', 'canonical_city_name']],
-        left_on=['seller_zip_code_prefix', 'seller_state'],
-        right_on=['zip_code_prefix', 'state'],
-        how='left'
-    )
+    # (accesseur .str vectorisé, un seul parcours par motif : les classes de caractères et
+    # alternatives sont compilées en une expression RE2 ; les villes manquantes ne lèvent aucun flag)
+    city = df_sellers['seller_city'].astype('string')
+    city_stripped = city.str.strip()
+    flags = {
+        # 1. Villes avec seulement des chiffres
+        'anomaly_numeric_city': city_stripped.str.isdigit(),
+        # 2. Villes contenant des slashs
+        'anomaly_contains_slashes': city.str.contains(r'[/\\]', regex=True),
+        # 3. Villes contenant des virgules
+        'anomaly_contains_commas': city.str.contains(',', regex=False),
+        # 4. Villes contenant 'brasil' (insensible à la casse)
+        'anomaly_contains_brasil': city.str.lower().str.contains('brasil', regex=False),
+        # 5. Villes trop courtes (moins de 3 caractères)
+        'anomaly_too_short': city_stripped.str.len() < 3,
+        # 6. Villes avec des espaces multiples ou des espaces inappropriés
+        'anomaly_extra_spaces': city.str.contains('  | / ', regex=True),
+    }
+    flags = {name: flag.fillna(False).to_numpy(dtype=bool) for name, flag in flags.items()}
+    
+    # Ajouter le nom canonique par recherche sur l'index (préfixe, état) de la référence,
+    # unique par construction : seule la colonne canonical_city_name est ajoutée
+    df_sellers_anomalies = join_zip_reference(df_sellers, df_zip_ref, 'seller_zip_code_prefix', 'seller_state')
     
     # Détecter les écarts par rapport au nom canonique
-    df_sellers_anomalies['has_canonical_mismatch'] = (
+    flags['has_canonical_mismatch'] = (
         (df_sellers_anomalies['canonical_city_name'].notna()) & 
         (df_sellers_anomalies['canonical_city_name'] != df_sellers_anomalies['seller_city'])
-    ).astype(int)
+    ).to_numpy(dtype=bool)
     
     # Calculer le taux total d'anomalies
     anomaly_columns = [
@@ -112,7 +100,12 @@ def detect_seller_anomalies():
         'anomaly_contains_brasil', 'anomaly_too_short', 'anomaly_extra_spaces', 'has_canonical_mismatch'
     ]
     
-    df_sellers_anomalies['total_anomaly_flags'] = df_sellers_anomalies[anomaly_columns].sum(axis=1)
+    # Flags empilés dans une matrice contiguë (vendeurs x flags) vue en int8 sans copie :
+    # le total par vendeur (au plus 7, en int16) est une seule réduction numpy
+    flag_matrix = np.stack([flags[col] for col in anomaly_columns], axis=1).view(np.int8)
+    df_sellers_anomalies[anomaly_columns] = flag_matrix
+    total_flags = flag_matrix.sum(axis=1, dtype=np.int16)
+    df_sellers_anomalies['total_anomaly_flags'] = total_flags
     
     # Sélectionner les colonnes pertinentes pour le résultat final
     result_columns = [
@@ -124,39 +117,45 @@ def detect_seller_anomalies():
         'total_anomaly_flags'
     ] + anomaly_columns
     
-    df_sellers_anomalies_final = df_sellers_anomalies[result_columns].copy()
+    df_sellers_anomalies_final = df_sellers_anomalies[result_columns]
     
     print(f"\nDonnées des vendeurs avec anomalies: {df_sellers_anomalies_final.shape[0]:,} lignes x {df_sellers_anomalies_final.shape[1]} colonnes")
     
     # Afficher un aperçu des résultats
-    print("\nAperçu des premières lignes:")
-    print(df_sellers_anomalies_final.head())
+    if VERBOSE:
+        print("\nAperçu des premières lignes:")
+        print(df_sellers_anomalies_final.head())
     
     # Afficher des statistiques sur les anomalies
     total_sellers = len(df_sellers_anomalies_final)
-    sellers_with_any_anomaly = (df_sellers_anomalies_final['total_anomaly_flags'] > 0).sum()
+    sellers_with_any_anomaly = np.count_nonzero(total_flags)
     percentage_with_anomaly = round((sellers_with_any_anomaly / total_sellers) * 100, 2)
     
     print(f"\nStatistiques d'anomalies:")
     print(f"- Total vendeurs: {total_sellers:,}")
     print(f"- Vendeurs avec au moins une anomalie: {sellers_with_any_anomaly:,} ({percentage_with_anomaly}%)")
     
-    print(f"\nRépartition des différents types d'anomalies:")
-    for col in anomaly_columns:
-        count = df_sellers_anomalies_final[col].sum()
-        pct = round((count / total_sellers) * 100, 2)
-        print(f"- {col}: {count:,} ({pct}%)")
+    # Sommes de toutes les colonnes de flags en une seule réduction sur la matrice contiguë,
+    # réutilisées par le rapport
+    anomaly_counts = pd.Series(flag_matrix.sum(axis=0, dtype=np.int64), index=anomaly_columns)
+    
+    if VERBOSE:
+        print(f"\nRépartition des différents types d'anomalies:")
+        for col, count in anomaly_counts.items():
+            pct = round((count / total_sellers) * 100, 2)
+            print(f"- {col}: {count:,} ({pct}%)")
     
     # Sauvegarder les données des vendeurs avec anomalies
-    output_path = os.path.join(PROCESSED_DATA_PATH, 'sellers_location_anomalies.csv')
-    df_sellers_anomalies_final.to_csv(output_path, index=False)
+    # Parquet compressé : types conservés pour les scripts en aval, pas de re-parsing texte
+    output_path = os.path.join(PROCESSED_DATA_PATH, 'sellers_location_anomalies.parquet')
+    df_sellers_anomalies_final.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
     print(f"\n[OK] Données des vendeurs avec anomalies sauvegardées: {output_path}")
     
     # Générer un rapport de validation
     anomaly_report = {}
-    for col in anomaly_columns:
-        anomaly_report[f'{col}_count'] = int(df_sellers_anomalies_final[col].sum())
-        anomaly_report[f'{col}_percentage'] = float(round((df_sellers_anomalies_final[col].sum() / total_sellers) * 100, 2))
+    for col, count in anomaly_counts.items():
+        anomaly_report[f'{col}_count'] = int(count)
+        anomaly_report[f'{col}_percentage'] = float(round((count / total_sellers) * 100, 2))
     
     validation_report = {
         'total_sellers': total_sellers,
@@ -8,10 +8,15 @@ import pandas as pd
 import numpy as np
 import os
 import yaml
+from concurrent.futures import ThreadPoolExecutor
+from zip_reference import load_zip_reference, join_zip_reference
 import warnings
 
 warnings.filterwarnings('ignore')
 
+# Aperçus détaillés (head, répartitions) uniquement sur demande : ETL_VERBOSE=1
+VERBOSE = os.environ.get('ETL_VERBOSE', '0') == '1'
+
 def load_configuration():
     """Charge la configuration depuis le fichier YAML"""
     with open('config/config.yaml', 'r') as f:
@@ -33,34 +38,34 @@ def enrich_customers_with_geolocation():
     # Charger la configuration
     RAW_DATA_PATH, PROCESSED_DATA_PATH, REPORTS_PATH = load_configuration()
     
-    # Charger les données clientes standardisées
-    print("Chargement des données clientes standardisées...")
-    customers_std_file = os.path.join(PROCESSED_DATA_PATH, 'customers_standardized.csv')
-    df_customers_std = pd.read_csv(customers_std_file)
-    
-    print(f"[OK] Données clientes standardisées chargées: {df_customers_std.shape[0]:,} lignes x {df_customers_std.shape[1]} colonnes")
-    
-    # Charger la table de référence géographique
-    print("Chargement de la table de référence géographique...")
-    zip_ref_file = os.path.join(PROCESSED_DATA_PATH, 'zip_code_reference.csv')
-    df_zip_ref = pd.read_csv(zip_ref_file)
-    
-    print(f"[OK] Table de référence chargée: {df_zip_ref.shape[0]:,} lignes x {df_zip_ref.shape[1]} colonnes")
+    # Charger les données clientes standardisées et la table de référence géographique :
+    # lectures indépendantes lancées en parallèle (le décodage pyarrow libère le GIL)
+    customers_std_file = os.path.join(PROCESSED_DATA_PATH, 'customers_standardized.parquet')
+    zip_ref_file = os.path.join(PROCESSED_DATA_PATH, 'zip_code_reference.parquet')
+    # Colonnes utilisées par la jointure, extraites de la table de référence partagée (lue une fois par processus)
+    zip_ref_columns = ['zip_code_prefix', 'state',
+                       'avg_latitude', 'avg_longitude',
+                       'coordinate_samples', 'data_quality',
+                       'lat_spread_km', 'lon_spread_km']
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        customers_std_future = executor.submit(pd.read_parquet, customers_std_file)
+        zip_ref_future = executor.submit(load_zip_reference, zip_ref_file, columns=zip_ref_columns)
+        
+        print("Chargement des données clientes standardisées...")
+        df_customers_std = customers_std_future.result()
+        print(f"[OK] Données clientes standardisées chargées: {df_customers_std.shape[0]:,} lignes x {df_customers_std.shape[1]} colonnes")
+        
+        print("Chargement de la table de référence géographique...")
+        df_zip_ref = zip_ref_future.result()
+        print(f"[OK] Table de référence chargée: {df_zip_ref.shape[0]:,} lignes x {df_zip_ref.shape[1]} colonnes")
     
     # Afficher les structures pour comprendre les colonnes
     print(f"\nColonnes clients standardisés: {list(df_customers_std.columns)}")
     print(f"Colonnes référence: {list(df_zip_ref.columns)}")
     
     # Fusionner les données clientes avec les informations géographiques
-    df_customers_geo = df_customers_std.merge(
-        df_zip_ref[['zip_code_prefix', 'state', 
-                   'avg_latitude', 'avg_longitude', 
-                   'coordinate_samples', 'data_quality',
-                   'lat_spread_km', 'lon_spread_km']],
-        left_on=['customer_zip_code_prefix', 'customer_state'],
-        right_on=['zip_code_prefix', 'state'],
-        how='left'
-    )
+    # Jointure gauche sur l'index (préfixe, état) de la référence, unique par construction
+    df_customers_geo = join_zip_reference(df_customers_std, df_zip_ref, 'customer_zip_code_prefix', 'customer_state')
     
     # Renommer les colonnes pour correspondre à la structure attendue
     df_customers_geo = df_customers_geo.rename(columns={
@@ -85,13 +90,20 @@ def enrich_customers_with_geolocation():
         'lon_spread_km'
     ]
     
-    df_customers_enriched = df_customers_geo[result_columns].copy()
+    # Types compacts : état et qualité en catégories (peu de modalités), nombre d'échantillons
+    # en entier non signé 16 bits nullable (absent pour les codes postaux sans référence)
+    df_customers_enriched = df_customers_geo[result_columns].astype({
+        'customer_state': 'category',
+        'geo_data_quality': 'category',
+        'geo_coordinate_samples': 'UInt16'
+    })
     
     print(f"\nDonnées clientes enrichies: {df_customers_enriched.shape[0]:,} lignes x {df_customers_enriched.shape[1]} colonnes")
     
     # Afficher un aperçu des résultats
-    print("\nAperçu des premières lignes:")
-    print(df_customers_enriched.head())
+    if VERBOSE:
+        print("\nAperçu des premières lignes:")
+        print(df_customers_enriched.head())
     
     # Afficher des statistiques sur l'enrichissement
     total_customers = len(df_customers_enriched)
@@ -103,13 +115,14 @@ def enrich_customers_with_geolocation():
     print(f"- Clients avec géolocalisation: {customers_with_geo:,} ({percentage_with_geo}%)")
     
     # Afficher la répartition de la qualité des données géographiques
-    if 'geo_data_quality' in df_customers_enriched.columns:
+    if VERBOSE and 'geo_data_quality' in df_customers_enriched.columns:
         print(f"\nRépartition de la qualité géographique:")
         print(df_customers_enriched['geo_data_quality'].value_counts())
     
     # Sauvegarder les données clientes enrichies
-    output_path = os.path.join(PROCESSED_DATA_PATH, 'customers_with_geolocation.csv')
-    df_customers_enriched.to_csv(output_path, index=False)
+    # Parquet compressé : types conservés pour le chargement en base, pas de re-parsing texte
+    output_path = os.path.join(PROCESSED_DATA_PATH, 'customers_with_geolocation.parquet')
+    df_customers_enriched.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
     print(f"\n[OK] Données clientes enrichies sauvegardées: {output_path}")
     
     # Générer un rapport de validation
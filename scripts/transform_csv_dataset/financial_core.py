@@ -0,0 +1,64 @@
+"""
+Fonctions communes aux scripts financiers (advanced_financial_cleaning, detect_clean_financial_anomalies).
+Construction de la jointure commandes / items / paiements.
+"""
+
+import pandas as pd
+
+def build_financial_join(orders, order_items, order_payments):
+    """Construit la table de réconciliation par commande : totaux items/paiements, écarts et flags d'anomalie"""
+
+    # Total ligne (prix + frais) calculé une fois en vectoriel avant l'agrégation ;
+    # les agrégats gardent order_id en index pour la jointure (pas de reset_index)
+    item_totals = order_items.assign(
+        line_total=order_items['price'] + order_items['freight_value']
+    ).groupby('order_id', sort=False).agg(
+        item_count=('order_item_id', 'count'),
+        seller_count=('seller_id', 'nunique'),
+        total_price=('price', 'sum'),
+        total_freight=('freight_value', 'sum'),
+        order_total=('line_total', 'sum')
+    )
+
+    # Types de paiement distincts par commande : dédoublonnage des paires puis tri,
+    # la jointure ne porte plus que sur les valeurs uniques
+    payment_types = (
+        order_payments[['order_id', 'payment_type']]
+        .drop_duplicates()
+        .sort_values('payment_type')
+        .groupby('order_id')['payment_type']
+        .agg(', '.join)
+    )
+
+    payment_totals = order_payments.groupby('order_id', sort=False).agg(
+        payment_count=('payment_sequential', 'count'),
+        payment_type_count=('payment_type', 'nunique'),
+        payment_total=('payment_value', 'sum'),
+        max_installments=('payment_installments', 'max')
+    )
+    payment_totals.insert(3, 'payment_types', payment_types)
+
+    # Jointure avec orders pour statut, directement sur l'index des agrégats
+    reconciliation = orders[['order_id', 'order_status']].join(
+        item_totals, on='order_id'
+    ).join(
+        payment_totals, on='order_id'
+    )
+
+    # Calcul des écarts
+    reconciliation['item_total'] = reconciliation['order_total'].fillna(0)
+    reconciliation['payment_total'] = reconciliation['payment_total'].fillna(0)
+    reconciliation['amount_difference'] = (reconciliation['item_total'] - reconciliation['payment_total']).abs()
+
+    # Flags d'anomalies
+    reconciliation['anomaly_no_items'] = reconciliation['item_count'].isna()
+    reconciliation['anomaly_no_payment'] = reconciliation['payment_count'].isna()
+    reconciliation['anomaly_amount_mismatch'] = reconciliation['amount_difference'] > 0.01
+    reconciliation['anomaly_many_payments'] = reconciliation['payment_count'] > 10
+    reconciliation['anomaly_many_items'] = reconciliation['item_count'] > 15
+    reconciliation['anomaly_delivered_no_payment'] = (
+        (reconciliation['order_status'] == 'delivered') &
+        reconciliation['anomaly_no_payment']
+    )
+
+    return reconciliation
@@ -215,26 +215,33 @@ class RelationalSchemaGenerator:
         
         tables = {}
         
-        # Lister les fichiers CSV dans le répertoire de données traitées
-        csv_files = list(self.processed_data_path.glob("*.csv"))
+        # Lister les fichiers CSV et Parquet dans le répertoire de données traitées
+        data_files = [*self.processed_data_path.glob("*.csv"), *self.processed_data_path.glob("*.parquet")]
         
-        # Ajouter les sous-répertoires
+        # Ajouter les sous-répertoires (hors caches de lecture _cache)
         for subdir in self.processed_data_path.iterdir():
-            if subdir.is_dir():
-                csv_files.extend(subdir.glob("*.csv"))
+            if subdir.is_dir() and subdir.name != '_cache':
+                data_files.extend(subdir.glob("*.csv"))
+                data_files.extend(subdir.glob("*.parquet"))
         
-        for csv_file in csv_files:
+        for data_file in data_files:
             try:
                 # Extraire le nom de la table à partir du nom de fichier
-                table_name = csv_file.stem.replace('.csv', '')
+                table_name = data_file.stem
                 
                 # Charger la table
-                df = pd.read_csv(csv_file, low_memory=False)
+                if data_file.suffix == '.parquet':
+                    df = pd.read_parquet(data_file)
+                    # Catégories et chaînes Arrow ramenées au type texte produit par read_csv
+                    text_cols = df.select_dtypes(include=['category', 'string']).columns
+                    df[text_cols] = df[text_cols].astype(object).infer_objects()
+                else:
+                    df = pd.read_csv(data_file, low_memory=False)
                 tables[table_name] = df
                 
                 logger.info(f"Table chargée: {table_name} ({len(df)} lignes, {len(df.columns)} colonnes)")
             except Exception as e:
-                logger.error(f"Erreur lors du chargement de {csv_file}: {str(e)}")
+                logger.error(f"Erreur lors du chargement de {data_file}: {str(e)}")
         
         return tables
     
@@ -7,24 +7,20 @@ def merge_product_translations(products_path, translation_path, output_path):
     """
     # Charger les fichiers
     df_products = pd.read_csv(products_path)
-    df_translation = pd.read_csv(translation_path)
+    translations = pd.read_csv(translation_path).set_index('product_category_name')['product_category_name_english']
 
-    # Fusionner sur la colonne de catégorie
-    df_merged = pd.merge(
-        df_products,
-        df_translation,
-        on='product_category_name',
-        how='left'  # Conserve tous les produits, même sans traduction
-    )
+    # Traduction par recherche sur l'index de catégorie (équivalent d'une jointure gauche :
+    # les produits sans traduction sont conservés avec une valeur manquante)
+    df_products['product_category_name_english'] = df_products['product_category_name'].map(translations)
 
-    # Sauvegarder le résultat
-    df_merged.to_csv(output_path, index=False)
+    # Sauvegarder le résultat en Parquet compressé (catégories répétées encodées par dictionnaire)
+    df_products.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
     print(f"Fusion terminée. Résultat sauvegardé dans : {output_path}")
 
 if __name__ == "__main__":
     # Chemins vers les fichiers
     PRODUCTS_PATH = "data/processed/cleaned/olist_products_clean.csv"
     TRANSLATION_PATH = "data/processed/cleaned/product_category_name_translation_clean.csv"
-    OUTPUT_PATH = "data/processed/cleaned/products_with_translations.csv"
+    OUTPUT_PATH = "data/processed/cleaned/products_with_translations.parquet"
 
     merge_product_translations(PRODUCTS_PATH, TRANSLATION_PATH, OUTPUT_PATH)
\ No newline at end of file
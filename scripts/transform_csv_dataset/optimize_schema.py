@@ -59,12 +59,13 @@ class SchemaAnalyzer:
         # Par exemple, si une colonne peut être déterminée à partir d'une autre
         functional_dependencies = []
         columns = df.columns.tolist()
+        # Chaque colonne est factorisée une seule fois en codes entiers, réutilisés pour toutes les paires
+        factor_codes = {col: self._factorize_column(df[col]) for col in columns}
         
         for i, col1 in enumerate(columns):
             for col2 in columns[i+1:]:
                 # Vérifier si col2 dépend fonctionnellement de col1
-                grouped = df.groupby(col1)[col2].nunique()
-                if (grouped == 1).all():  # Pour chaque valeur de col1, il n'y a qu'une seule valeur de col2
+                if self._functionally_determines(factor_codes[col1], factor_codes[col2], len(df)):
                     functional_dependencies.append({
                         'dependent_column': col2,
                         'determinant_column': col1,
@@ -76,9 +77,13 @@ class SchemaAnalyzer:
         # Identifier les colonnes qui pourraient être divisées (ex: nom complet en prénom/nom)
         potential_splits = []
         for col in df.select_dtypes(include=['object']).columns:
+            values = df[col].dropna()
+            if pd.api.types.infer_dtype(values, skipna=True) != 'string':
+                # Colonne mixte : les valeurs non textuelles comptent comme des chaînes vides (aucun séparateur, 0 mot)
+                values = values.where(values.map(lambda x: isinstance(x, str)), '')
             # Vérifier si la colonne contient des séparateurs courants
-            if df[col].dropna().apply(lambda x: isinstance(x, str) and (' ' in x or '-' in x or '_' in x)).any():
-                avg_word_count = df[col].dropna().apply(lambda x: len(str(x).split()) if isinstance(x, str) else 0).mean()
+            if values.str.contains('[ _-]', regex=True).any():
+                avg_word_count = values.str.split().str.len().mean()
                 if avg_word_count > 1.5:
                     potential_splits.append({
                         'column': col,
@@ -89,6 +94,47 @@ class SchemaAnalyzer:
         
         return analysis
     
+    @staticmethod
+    def _factorize_column(series: pd.Series) -> Tuple[np.ndarray, int, bool]:
+        """
+        Factorise une colonne : codes entiers (-1 pour les valeurs manquantes), nombre de valeurs
+        distinctes et présence de valeurs manquantes
+        """
+        codes, uniques = pd.factorize(series)
+        return codes, len(uniques), bool((codes < 0).any())
+    
+    @staticmethod
+    def _functionally_determines(determinant: Tuple[np.ndarray, int, bool],
+                                 dependent: Tuple[np.ndarray, int, bool], row_count: int) -> bool:
+        """
+        Équivalent de (df.groupby(col1)[col2].nunique() == 1).all() sur les codes factorisés :
+        chaque valeur présente de col1 doit correspondre à exactement une valeur non manquante de col2
+        (les lignes où col1 manque sont ignorées, comme par le groupby)
+        """
+        codes1, n_groups, missing1 = determinant
+        codes2, n_values2, missing2 = dependent
+        
+        # Cas triviaux, sans parcours des lignes
+        if n_groups == 0:
+            return True
+        if n_values2 == 0:
+            return False
+        if not missing2 and (n_values2 == 1 or n_groups == row_count):
+            return True
+        if not missing1 and n_values2 > n_groups:
+            # Chaque groupe n'a qu'une valeur de col2 : au plus n_groups valeurs distinctes
+            return False
+        
+        if missing1 or missing2:
+            valid = (codes1 >= 0) & (codes2 >= 0)
+            codes1, codes2 = codes1[valid], codes2[valid]
+        
+        # Une valeur de col2 retenue par groupe (dispersion), puis toutes les lignes du groupe
+        # doivent la porter (collecte) ; un groupe sans valeur retenue n'a que des col2 manquants
+        group_value = np.full(n_groups, -1, dtype=codes2.dtype)
+        group_value[codes1] = codes2
+        return bool((group_value >= 0).all() and (group_value[codes1] == codes2).all())
+    
     def analyze_data_types_optimization(self, df: pd.DataFrame, table_name: str) -> Dict[str, Any]:
         """
         Analyse les opportunités d'optimisation des types de données
@@ -267,26 +313,33 @@ class SchemaAnalyzer:
         
         tables = {}
         
-        # Lister les fichiers CSV dans le répertoire de données traitées
-        csv_files = list(self.processed_data_path.glob("*.csv"))
+        # Lister les fichiers CSV et Parquet dans le répertoire de données traitées
+        data_files = [*self.processed_data_path.glob("*.csv"), *self.processed_data_path.glob("*.parquet")]
         
-        # Ajouter les sous-répertoires
+        # Ajouter les sous-répertoires (hors caches de lecture _cache)
         for subdir in self.processed_data_path.iterdir():
-            if subdir.is_dir():
-                csv_files.extend(subdir.glob("*.csv"))
+            if subdir.is_dir() and subdir.name != '_cache':
+                data_files.extend(subdir.glob("*.csv"))
+                data_files.extend(subdir.glob("*.parquet"))
         
-        for csv_file in csv_files:
+        for data_file in data_files:
             try:
                 # Extraire le nom de la table à partir du nom de fichier
-                table_name = csv_file.stem.replace('.csv', '')
+                table_name = data_file.stem
                 
                 # Charger la table
-                df = pd.read_csv(csv_file, low_memory=False)
+                if data_file.suffix == '.parquet':
+                    df = pd.read_parquet(data_file)
+                    # Catégories et chaînes Arrow ramenées au type texte produit par read_csv
+                    text_cols = df.select_dtypes(include=['category', 'string']).columns
+                    df[text_cols] = df[text_cols].astype(object).infer_objects()
+                else:
+                    df = pd.read_csv(data_file, low_memory=False)
                 tables[table_name] = df
                 
                 logger.info(f"Table chargée: {table_name} ({len(df)} lignes, {len(df.columns)} colonnes)")
             except Exception as e:
-                logger.error(f"Erreur lors du chargement de {csv_file}: {str(e)}")
+                logger.error(f"Erreur lors du chargement de {data_file}: {str(e)}")
         
         return tables
     
@@ -0,0 +1,50 @@
+"""
+Chargement des CSV bruts avec cache Feather (raw_data/_cache), partagé par les scripts de transformation.
+"""
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+from pathlib import Path
+
+def read_csv_arrow(csv_path, dtype=None):
+    """
+    Lit un CSV via le parseur pyarrow ; les colonnes demandées en texte (str) lui sont imposées
+    comme chaînes, sans quoi il reconnaît les horodatages et réécrit leur texte
+    ('2017-02-01 00:00:00' devient '2017-02-01'), même avec dtype=str dans read_csv
+    """
+    dtype = dtype or {}
+    text_columns = {col: pa.string() for col, col_type in dtype.items() if col_type is str}
+    # Valeurs manquantes reconnues comme par read_csv(engine='pyarrow'), chaînes vides comprises
+    convert_options = pa_csv.ConvertOptions(column_types=text_columns, strings_can_be_null=True)
+    convert_options.null_values = [*convert_options.null_values, 'None', '<NA>']
+    table = pa_csv.read_csv(csv_path, convert_options=convert_options)
+    # Colonnes entièrement vides en float64, comme read_csv(engine='pyarrow')
+    table = table.cast(pa.schema([
+        field.with_type(pa.float64()) if pa.types.is_null(field.type) else field for field in table.schema
+    ]))
+    return table.to_pandas().astype(dtype)
+
+def _same_dtype(actual, requested):
+    """Compare un type lu au type demandé ('category' accepte toute liste de catégories)"""
+    return actual == (requested if isinstance(requested, str) else pd.api.types.pandas_dtype(requested))
+
+def load_cached(csv_path, dtype=None, usecols=None):
+    """Lit un CSV brut via un cache Feather (raw_data/_cache), régénéré si le CSV est plus récent"""
+    csv_path = Path(csv_path)
+    cache_path = csv_path.parent / "_cache" / csv_path.with_suffix(".feather").name
+    dtype = dtype or {}
+
+    if cache_path.exists() and cache_path.stat().st_mtime >= csv_path.stat().st_mtime:
+        df = pd.read_feather(cache_path, columns=usecols)
+        # Un cache écrit avec d'autres types que ceux demandés (version antérieure d'un script)
+        # est régénéré : une conversion ne rendrait pas les valeurs du CSV (texte des
+        # horodatages, précision des flottants lus en float32)
+        if all(_same_dtype(df[col].dtype, col_type) for col, col_type in dtype.items() if col in df.columns):
+            return df
+
+    # Le cache contient toujours la table complète : usecols n'est appliqué qu'au retour
+    df = read_csv_arrow(csv_path, dtype)
+    cache_path.parent.mkdir(exist_ok=True)
+    df.to_feather(cache_path)
+    return df[usecols] if usecols is not None else df
@@ -0,0 +1,29 @@
+"""
+Script pour exécuter l'étape géographique complète dans un seul processus :
+table de référence, standardisation et enrichissement des clients, détection d'anomalies,
+standardisation et enrichissement des vendeurs.
+La table de référence n'est ainsi décodée qu'une fois (cache de zip_reference) pour tous les scripts.
+"""
+
+from create_zip_code_reference import create_zip_code_reference
+from standardize_customers import standardize_customers
+from enrich_customers_with_geolocation import enrich_customers_with_geolocation
+from detect_seller_anomalies import detect_seller_anomalies
+from standardize_sellers import standardize_sellers
+from enrich_sellers_with_geolocation import enrich_sellers_with_geolocation
+
+def run_geo_stage():
+    """Enchaîne les scripts de l'étape géographique dans l'ordre de leurs dépendances"""
+    create_zip_code_reference()
+
+    # Chaîne clients
+    standardize_customers()
+    enrich_customers_with_geolocation()
+
+    # Chaîne vendeurs
+    detect_seller_anomalies()
+    standardize_sellers()
+    enrich_sellers_with_geolocation()
+
+if __name__ == "__main__":
+    run_geo_stage()
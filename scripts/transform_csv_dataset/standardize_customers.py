@@ -7,6 +7,7 @@ import pandas as pd
 import numpy as np
 import os
 import yaml
+from zip_reference import load_zip_reference, join_zip_reference
 import warnings
 
 warnings.filterwarnings('ignore')
@@ -35,14 +36,19 @@ def standardize_customers():
     # Charger les données clients
     print("Chargement des données clients...")
     customers_file = os.path.join(RAW_DATA_PATH, 'olist_customers_dataset.csv')
-    df_customers = pd.read_csv(customers_file)
+    # Types explicites : identifiants en chaînes Arrow, préfixe en entier nullable Int32 (un préfixe
+    # manquant reste NA au lieu de faire échouer la lecture), état peu cardinal en catégorie
+    df_customers = pd.read_csv(customers_file, engine='pyarrow', dtype={
+        'customer_id': 'string[pyarrow]', 'customer_unique_id': 'string[pyarrow]',
+        'customer_zip_code_prefix': 'Int32', 'customer_city': 'str', 'customer_state': 'category'
+    })
     
     print(f"[OK] Données clients chargées: {df_customers.shape[0]:,} lignes x {df_customers.shape[1]} colonnes")
     
     # Charger la table de référence géographique
     print("Chargement de la table de référence géographique...")
-    zip_ref_file = os.path.join(PROCESSED_DATA_PATH, 'zip_code_reference.csv')
-    df_zip_ref = pd.read_csv(zip_ref_file)
+    zip_ref_file = os.path.join(PROCESSED_DATA_PATH, 'zip_code_reference.parquet')
+    df_zip_ref = load_zip_reference(zip_ref_file, columns=['zip_code_prefix', 'state', 'canonical_city_name'])
     
     print(f"[OK] Table de référence chargée: {df_zip_ref.shape[0]:,} lignes x {df_zip_ref.shape[1]} colonnes")
     
@@ -50,23 +56,9 @@ def standardize_customers():
     print(f"\nColonnes clients: {list(df_customers.columns)}")
     print(f"Colonnes référence: {list(df_zip_ref.columns)}")
     
-    # Renommer les colonnes si nécessaire pour correspondre à la structure attendue
-    df_customers_renamed = df_customers.rename(columns={
-        'customer_zip_code_prefix': 'customer_zip_code_prefix',
-        'customer_city': 'customer_city',
-        'customer_state': 'customer_state'
-    })
-    
-    # Créer une copie pour la standardisation
-    df_customers_std = df_customers_renamed.copy()
-    
-    # Ajouter le nom de ville canonique en joignant avec la table de référence
-    df_customers_std = df_customers_std.merge(
-        df_zip_ref[['zip_code_prefix', 'state', 'canonical_city_name']],
-        left_on=['customer_zip_code_prefix', 'customer_state'],
-        right_on=['zip_code_prefix', 'state'],
-        how='left'
-    )
+    # Ajouter le nom de ville canonique : jointure plusieurs-vers-un sur (préfixe, état),
+    # qui renvoie un nouveau DataFrame (pas de copie préalable des données clients)
+    df_customers_std = join_zip_reference(df_customers, df_zip_ref, 'customer_zip_code_prefix', 'customer_state')
     
     # Créer la colonne du nom de ville standardisé
     # Utiliser le nom canonique si disponible, sinon conserver l'original
@@ -92,7 +84,7 @@ def standardize_customers():
         'city_name_standardized'
     ]
     
-    df_customers_final = df_customers_std[result_columns].copy()
+    df_customers_final = df_customers_std[result_columns]
     
     print(f"\nDonnées clientes standardisées: {df_customers_final.shape[0]:,} lignes x {df_customers_final.shape[1]} colonnes")
     
@@ -110,8 +102,9 @@ def standardize_customers():
     print(f"- Clients avec ville standardisée: {standardized_customers:,} ({percentage_standardized}%)")
     
     # Sauvegarder les données clientes standardisées
-    output_path = os.path.join(PROCESSED_DATA_PATH, 'customers_standardized.csv')
-    df_customers_final.to_csv(output_path, index=False)
+    # Parquet compressé : types conservés pour les scripts en aval, pas de re-parsing texte
+    output_path = os.path.join(PROCESSED_DATA_PATH, 'customers_standardized.parquet')
+    df_customers_final.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
     print(f"\n[OK] Données clientes standardisées sauvegardées: {output_path}")
     
     # Générer un rapport de validation
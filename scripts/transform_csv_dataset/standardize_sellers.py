@@ -34,8 +34,8 @@ def standardize_sellers():
     
     # Charger les données des vendeurs avec anomalies
     print("Chargement des données des vendeurs avec anomalies...")
-    sellers_anomalies_file = os.path.join(PROCESSED_DATA_PATH, 'sellers_location_anomalies.csv')
-    df_sellers_anomalies = pd.read_csv(sellers_anomalies_file)
+    sellers_anomalies_file = os.path.join(PROCESSED_DATA_PATH, 'sellers_location_anomalies.parquet')
+    df_sellers_anomalies = pd.read_parquet(sellers_anomalies_file)
     
     print(f"[OK] Données des vendeurs avec anomalies chargées: {df_sellers_anomalies.shape[0]:,} lignes x {df_sellers_anomalies.shape[1]} colonnes")
     
@@ -125,8 +125,9 @@ def standardize_sellers():
         print(f"- {col}: {count:,} ({pct}%)")
     
     # Sauvegarder les données des vendeurs standardisées
-    output_path = os.path.join(PROCESSED_DATA_PATH, 'sellers_standardized.csv')
-    df_sellers_final.to_csv(output_path, index=False)
+    # Parquet compressé : types conservés pour les scripts en aval, pas de re-parsing texte
+    output_path = os.path.join(PROCESSED_DATA_PATH, 'sellers_standardized.parquet')
+    df_sellers_final.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
     print(f"\n[OK] Données des vendeurs standardisées sauvegardées: {output_path}")
     
     # Générer un rapport de validation
@@ -0,0 +1,32 @@
+"""
+Chargement de la table de référence géographique (zip_code_reference.parquet), partagé par les scripts
+de standardisation, d'enrichissement géographique et de détection d'anomalies.
+"""
+
+import functools
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+@functools.lru_cache(maxsize=None)
+def _read_zip_reference(path):
+    """Lit la table complète une seule fois par processus et par chemin"""
+    return pd.read_parquet(path)
+
+def load_zip_reference(path, columns=None):
+    """Renvoie la table de référence (ou les colonnes demandées) depuis la lecture mise en cache"""
+    df = _read_zip_reference(str(path))
+    # Sélection systématique : l'appelant reçoit son propre DataFrame, jamais l'objet en cache
+    return df[list(columns) if columns is not None else list(df.columns)]
+
+def join_zip_reference(df, df_zip_ref, zip_column, state_column):
+    """Jointure gauche plusieurs-vers-un de la table de référence sur (préfixe, état)"""
+    # États des deux côtés en catégories partagées : la jointure compare des codes entiers
+    # au lieu de hacher les chaînes
+    states = union_categoricals(
+        [df[state_column].astype('category'), df_zip_ref['state'].astype('category')], ignore_order=True
+    ).categories
+    state_dtype = pd.CategoricalDtype(states)
+    reference = df_zip_ref.astype({'state': state_dtype}).set_index(['zip_code_prefix', 'state'])
+    return df.astype({state_column: state_dtype}).join(
+        reference, on=[zip_column, state_column], validate='many_to_one'
+    )